@@ -1,25 +1,113 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 from lead_scraper import LeadScraper
+from result_delivery import ResultDispatcher, check_callback_url
+from result_store import ResultStore
+from serialization import negotiate_format, serialize
 
 # Load environment variables
 load_dotenv()
 
-# Debug: Print environment variable status
-api_key = os.getenv('BROWSER_USE_API_KEY')
-if api_key:
-    print(f"✅ BROWSER_USE_API_KEY loaded: {api_key[:20]}...")
-else:
-    print("❌ WARNING: BROWSER_USE_API_KEY not found in environment!")
-    print(f"Available env vars: {list(os.environ.keys())}")
-
 app = Flask(__name__, static_folder='static', static_url_path='')
 CORS(app)
 
-lead_scraper = LeadScraper()
+result_store = ResultStore()
+
+MAX_PAGE_SIZE = 500
+
+# How long a min_leads request waits when it doesn't give a deadline_ms
+SPECULATIVE_DEFAULT_TIMEOUT_MS = int(os.getenv('SPECULATIVE_DEFAULT_TIMEOUT_MS', 120000))
+
+# Set up by init_services(), so a process that only imports this module
+# (e.g. a post-processing worker re-importing __main__) starts nothing
+lead_scraper = None
+job_executor = None
+progressive_executor = None
+result_dispatcher = None
+
+def init_services():
+    """Create the scraper, job pools and result delivery for the server process"""
+    global lead_scraper, job_executor, progressive_executor, result_dispatcher
+    if lead_scraper is not None:
+        return
+    
+    # Debug: Print environment variable status
+    api_key = os.getenv('BROWSER_USE_API_KEY')
+    if api_key:
+        print(f"✅ BROWSER_USE_API_KEY loaded: {api_key[:20]}...")
+    else:
+        print("❌ WARNING: BROWSER_USE_API_KEY not found in environment!")
+        print(f"Available env vars: {list(os.environ.keys())}")
+    
+    lead_scraper = LeadScraper()
+    # Fire-and-forget jobs run here; results are stored and go out through the dispatcher
+    job_executor = ThreadPoolExecutor(max_workers=int(os.getenv('BACKGROUND_JOB_WORKERS', 4)))
+    # deadline_ms / min_leads scrapes get their own pool so a backlog of async
+    # jobs can't leave a waiting request with nothing started
+    progressive_executor = ThreadPoolExecutor(max_workers=int(os.getenv('PROGRESSIVE_JOB_WORKERS', 8)))
+    result_dispatcher = ResultDispatcher()
+    result_dispatcher.start()
+
+def create_app():
+    """Start the services and return the app (gunicorn: 'app:create_app()')"""
+    init_services()
+    return app
+
+def run_background_job(result_id, query, num_leads, require_email, callback_url, email):
+    """Scrape into a stored result and hand the outcome to the dispatcher"""
+    result = {'job_id': result_id, 'result_id': result_id, 'query': query}
+    try:
+        leads = lead_scraper.scrape_google_maps(query, num_leads, require_email)
+        result_store.append(result_id, leads)
+        result_store.finish(result_id)
+        result.update({'success': True, 'leads': leads, 'count': len(leads)})
+    except Exception as e:
+        print(f"Error in background job {result_id}: {str(e)}")
+        result_store.finish(result_id, error=str(e))
+        result.update({'success': False, 'error': str(e), 'leads': [], 'count': 0})
+    result_dispatcher.enqueue(result, callback_url=callback_url, email=email)
+
+def run_progressive_job(result_id, query, num_leads, require_email, email):
+    """Fill a stored result as leads come in so callers can read it before it is done"""
+    try:
+        lead_scraper.scrape_google_maps_progressive(
+            query, num_leads, require_email,
+            lambda leads: result_store.append(result_id, leads),
+            lambda index, lead: result_store.update(result_id, index, lead)
+        )
+    except Exception as e:
+        print(f"Error in progressive job {result_id}: {str(e)}")
+        result_store.finish(result_id, error=str(e))
+        return
+    result_store.finish(result_id)
+    
+    result = result_store.get(result_id)
+    if result is not None:
+        result_dispatcher.enqueue(
+            {'query': query, 'success': True, 'result_id': result_id,
+             'leads': result['leads'], 'count': len(result['leads'])},
+            email=email
+        )
+
+def parse_page_limit(value):
+    """Validate a page size from the request, None when not given"""
+    if value in (None, ''):
+        return None
+    limit = int(value)
+    if limit < 1:
+        limit = 1
+    if limit > MAX_PAGE_SIZE:
+        limit = MAX_PAGE_SIZE
+    return limit
+
+def leads_response(payload, fmt, status=200):
+    """Encode a leads payload in the negotiated format and compression"""
+    body, headers = serialize(payload, fmt, request.headers.get('Accept-Encoding', ''))
+    return Response(body, status=status, headers=headers)
 
 @app.route('/')
 def index():
@@ -36,18 +124,51 @@ def get_leads():
         query = data.get('query', '')
         num_leads = int(data.get('num_leads', 20))  # Convert to integer
         email = data.get('email', '')
+        callback_url = data.get('callback_url', '')
         
         # Handle require_email as boolean (can come as string from n8n)
         require_email = data.get('require_email', False)
         if isinstance(require_email, str):
             require_email = require_email.lower() in ('true', '1', 'yes')
         
+        run_async = data.get('async', False)
+        if isinstance(run_async, str):
+            run_async = run_async.lower() in ('true', '1', 'yes')
+        
+        try:
+            limit = parse_page_limit(data.get('limit'))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        
+        try:
+            fmt = negotiate_format(data.get('format', ''), request.headers.get('Accept', ''))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 406
+        
+        try:
+            deadline_ms = int(data['deadline_ms']) if data.get('deadline_ms') not in (None, '') else None
+            min_leads = int(data['min_leads']) if data.get('min_leads') not in (None, '') else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'deadline_ms and min_leads must be integers'}), 400
+        
+        if deadline_ms is not None and deadline_ms < 1:
+            return jsonify({'error': 'deadline_ms must be positive'}), 400
+        
+        if min_leads is not None and min_leads < 1:
+            return jsonify({'error': 'min_leads must be at least 1'}), 400
+        
         if not query:
             return jsonify({'error': 'Query is required'}), 400
         
         if not email:
             return jsonify({'error': 'Email is required'}), 400
         
+        if callback_url:
+            try:
+                check_callback_url(callback_url)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        
         # Ensure num_leads is within valid range
         if num_leads < 1:
             num_leads = 1
@@ -58,19 +179,124 @@ def get_leads():
         print(f"Email extraction: {'ENABLED' if require_email else 'DISABLED'}")
         print(f"Results will be sent to: {email}")
         
+        # With a callback URL (or async=true) respond right away and deliver later
+        if callback_url or run_async:
+            # The stored result is the handle: GET /api/leads/<result_id> reads it
+            result_id = result_store.create(query)
+            job_executor.submit(run_background_job, result_id, query, num_leads,
+                                require_email, callback_url, email)
+            return jsonify({
+                'success': True,
+                'status': 'accepted',
+                'job_id': result_id,
+                'result_id': result_id,
+                'callback_url': callback_url,
+                'email': email,
+                'email_delivery': result_dispatcher.email_enabled
+            }), 202
+        
+        # Speculative early return: answer once enough leads are in or the
+        # deadline passes, and keep scraping into the stored result
+        if deadline_ms is not None or min_leads is not None:
+            min_leads = num_leads if min_leads is None else min(min_leads, num_leads)
+            result_id = result_store.create(query)
+            progressive_executor.submit(run_progressive_job, result_id, query, num_leads,
+                                        require_email, email)
+            
+            if deadline_ms is None:
+                deadline_ms = SPECULATIVE_DEFAULT_TIMEOUT_MS
+            result = result_store.wait(result_id, min_leads, deadline_ms / 1000)
+            if result is None:
+                return jsonify({'error': 'Result expired before it was ready'}), 500
+            if result['status'] == 'failed' and not result['leads']:
+                return jsonify({'error': result['error']}), 500
+            
+            page, total, next_cursor = result_store.page(
+                result_id, limit or max(1, len(result['leads']))
+            )
+            return leads_response({
+                'success': True,
+                'result_id': result_id,
+                'status': result['status'],
+                'partial': result['status'] == 'running',
+                'leads': page,
+                'count': len(page),
+                'total': total,
+                'next_cursor': next_cursor,
+                'email': email
+            }, fmt)
+        
         leads = lead_scraper.scrape_google_maps(query, num_leads, require_email)
+        result_id = result_store.save(leads, query)
+        result_dispatcher.enqueue(
+            {'query': query, 'success': True, 'result_id': result_id,
+             'leads': leads, 'count': len(leads)},
+            email=email
+        )
         
-        return jsonify({
+        # Without a limit keep returning everything for existing clients
+        if limit is None:
+            return leads_response({
+                'success': True,
+                'result_id': result_id,
+                'status': 'complete',
+                'leads': leads,
+                'count': len(leads),
+                'total': len(leads),
+                'next_cursor': '',
+                'email': email
+            }, fmt)
+        
+        page, total, next_cursor = result_store.page(result_id, limit)
+        return leads_response({
             'success': True,
-            'leads': leads,
-            'count': len(leads),
+            'result_id': result_id,
+            'status': 'complete',
+            'leads': page,
+            'count': len(page),
+            'total': total,
+            'next_cursor': next_cursor,
             'email': email
-        })
+        }, fmt)
     
     except Exception as e:
         print(f"Error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/leads/<result_id>', methods=['GET'])
+def get_leads_page(result_id):
+    """Serve a stored result page by page using limit/cursor"""
+    try:
+        limit = parse_page_limit(request.args.get('limit')) or 50
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    
+    try:
+        fmt = negotiate_format(request.args.get('format', ''), request.headers.get('Accept', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 406
+    
+    try:
+        page = result_store.page(result_id, limit, request.args.get('cursor', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    state = result_store.status(result_id)
+    if page is None or state is None:
+        return jsonify({'error': 'Result not found or expired'}), 404
+    
+    leads, total, next_cursor = page
+    return leads_response({
+        'success': True,
+        'result_id': result_id,
+        'status': state['status'],
+        'error': state['error'],
+        'leads': leads,
+        'count': len(leads),
+        'total': total,
+        'next_cursor': next_cursor
+    }, fmt)
+
 @app.route('/api/status', methods=['GET'])
 def status():
     api_key = os.getenv('BROWSER_USE_API_KEY')
@@ -78,7 +304,9 @@ def status():
         'status': 'ok', 
         'service': 'Google Maps Lead Scraper',
         'api_key_configured': bool(api_key),
-        'api_key_preview': api_key[:20] + '...' if api_key else None
+        'api_key_preview': api_key[:20] + '...' if api_key else None,
+        'delivery': result_dispatcher.stats(),
+        'task_concurrency': lead_scraper.task_limiter.metrics()
     })
 
 @app.route('/api/debug', methods=['GET'])
@@ -95,4 +323,4 @@ def debug():
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(debug=False, host='0.0.0.0', port=port)
+    create_app().run(debug=False, host='0.0.0.0', port=port)
@@ -0,0 +1,73 @@
+"""
+Benchmark for /api/leads response serialization
+Compares bytes on the wire and encode time per 10k leads for every
+format and compression combination available in this environment
+"""
+
+import time
+import random
+
+from flask import Flask
+
+import serialization
+from serialization import encode, compress, available_encodings, MSGPACK_AVAILABLE, ORJSON_AVAILABLE
+
+NUM_LEADS = 10000
+REPEATS = 5
+
+def make_leads(count):
+    """Build realistic-looking synthetic leads"""
+    random.seed(42)
+    streets = ['Orchard Rd', 'Fergusson College Rd', 'Main St', 'High Street', 'Market Ave']
+    leads = []
+    for i in range(count):
+        name = f"Business {i} {random.choice(['Cafe', 'Dental Clinic', 'Restaurant', 'Salon'])}"
+        domain = f"business{i}.example.com"
+        leads.append({
+            'name': name,
+            'address': f"{random.randint(1, 999)} {random.choice(streets)}, Floor {random.randint(1, 9)}",
+            'phone': f"+65 {random.randint(6000, 9999)} {random.randint(1000, 9999)}",
+            'website': f"https://{domain}/" if random.random() < 0.8 else '',
+            'email': f"info@{domain}" if random.random() < 0.5 else ''
+        })
+    return leads
+
+def time_call(func):
+    """Best of REPEATS runs, in milliseconds"""
+    best = float('inf')
+    result = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return result, best
+
+def main():
+    leads = make_leads(NUM_LEADS)
+    payload = {'success': True, 'leads': leads, 'count': len(leads), 'total': len(leads)}
+
+    print("=" * 76)
+    print(f"Serialization benchmark - {NUM_LEADS} leads, best of {REPEATS}")
+    print(f"orjson: {'yes' if ORJSON_AVAILABLE else 'no'} | msgpack: {'yes' if MSGPACK_AVAILABLE else 'no'} | "
+          f"encodings: {', '.join(available_encodings())}")
+    print("=" * 76)
+    print(f"{'format':<26}{'encoding':<10}{'bytes':>12}{'encode ms':>12}{'compress ms':>14}")
+
+    # Baseline is exactly what jsonify sends in production (compact, sorted keys)
+    flask_app = Flask(__name__)
+    variants = [('json (stdlib, jsonify)', lambda: flask_app.json.response(payload).get_data())]
+    for fmt in serialization.FORMATS:
+        if fmt == 'msgpack' and not MSGPACK_AVAILABLE:
+            continue
+        label = f"{fmt} ({'orjson' if ORJSON_AVAILABLE and fmt != 'msgpack' else 'default'})"
+        variants.append((label, lambda fmt=fmt: encode(payload, fmt)[0]))
+
+    for label, encoder in variants:
+        body, encode_ms = time_call(encoder)
+        print(f"{label:<26}{'identity':<10}{len(body):>12,}{encode_ms:>12.1f}{'-':>14}")
+        for encoding in available_encodings():
+            compressed, compress_ms = time_call(lambda: compress(body, encoding))
+            print(f"{'':<26}{encoding:<10}{len(compressed):>12,}{encode_ms:>12.1f}{compress_ms:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Whether an SDK/HTTP error means the provider is asking us to slow down"""
+    status_code = getattr(error, 'status_code', None)
+    if status_code is None:
+        status_code = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status_code == 429:
+        return True
+    message = str(error).lower()
+    return '429' in message or 'rate limit' in message or 'too many' in message
+
+
+def is_overload_error(error: Exception) -> bool:
+    """Server-side failures that suggest the provider is overloaded"""
+    status_code = getattr(error, 'status_code', None)
+    if status_code is None:
+        status_code = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status_code in (502, 503, 504)
+
+
+class TaskFailed(Exception):
+    """A task that came back without raising but did not succeed"""
+
+
+class _Slot:
+    def __init__(self):
+        self.error: Optional[Exception] = None
+
+    def fail(self, error: Exception) -> None:
+        """Count this task as failed even though no exception escaped the slot"""
+        self.error = error
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limiter for in-flight Browser-Use tasks
+
+    The limit grows by roughly one slot per limit's worth of successful
+    tasks while there is demand for more: callers are waiting, or the
+    average queue wait is above BU_QUEUE_WAIT_TARGET. It is cut
+    multiplicatively on rate-limit or overload errors and on failed tasks
+    reported through the slot. Task duration is only reported: it mostly
+    follows the job size (num_leads, require_email) rather than provider
+    load. Callers wait in a queue for a free slot, so bursts are smoothed
+    instead of turning into throttling storms.
+    """
+
+    def __init__(self, initial_limit: Optional[int] = None, min_limit: Optional[int] = None,
+                 max_limit: Optional[int] = None):
+        self.min_limit = min_limit or int(os.getenv('BU_MIN_CONCURRENCY', 1))
+        self.max_limit = max_limit or int(os.getenv('BU_MAX_CONCURRENCY', 10))
+        initial_limit = initial_limit or int(os.getenv('BU_INITIAL_CONCURRENCY', 2))
+        self.backoff = float(os.getenv('BU_CONCURRENCY_BACKOFF', 0.5))
+        self.queue_timeout = float(os.getenv('BU_QUEUE_TIMEOUT', 600))
+        self.queue_wait_target = float(os.getenv('BU_QUEUE_WAIT_TARGET', 1))
+        # Ignore further decreases for this long so one burst of errors counts once
+        self.cooldown = float(os.getenv('BU_CONCURRENCY_COOLDOWN', 30))
+
+        self._limit = float(max(self.min_limit, min(self.max_limit, initial_limit)))
+        self._in_flight = 0
+        self._waiting = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+        self._successes = 0
+        self._rate_limited = 0
+        self._errors = 0
+        self._failed_tasks = 0
+        self._latency_ewma = 0.0
+        self._queue_wait_ewma = 0.0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold one in-flight slot for the duration of a task
+
+        Yields a handle whose fail() records a task that returned an
+        unsuccessful result without raising.
+
+        Raises:
+            TimeoutError: If no slot frees up within the queue timeout
+        """
+        self.acquire()
+        handle = _Slot()
+        started = time.monotonic()
+        try:
+            yield handle
+        except Exception as e:
+            self.release(time.monotonic() - started, e)
+            raise
+        self.release(time.monotonic() - started, handle.error)
+
+    def acquire(self) -> None:
+        queued_at = time.monotonic()
+        deadline = queued_at + self.queue_timeout
+        with self._condition:
+            self._waiting += 1
+            try:
+                while self._in_flight >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(
+                            f"No Browser-Use task slot became free within {self.queue_timeout:.0f}s "
+                            f"(limit {self.limit}, in flight {self._in_flight})"
+                        )
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._in_flight += 1
+            self._queue_wait_ewma = self._ewma(self._queue_wait_ewma, time.monotonic() - queued_at)
+
+    def release(self, latency: float, error: Optional[Exception] = None) -> None:
+        with self._condition:
+            saturated = self._in_flight >= self.limit
+            self._in_flight -= 1
+
+            if error is None:
+                self._successes += 1
+                self._latency_ewma = self._ewma(self._latency_ewma, latency)
+                if self._waiting or (saturated and self._queue_wait_ewma >= self.queue_wait_target):
+                    # Additive increase while callers queue: about +1 per limit's worth of successes
+                    self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            elif is_rate_limit_error(error):
+                self._rate_limited += 1
+                self._decrease("rate limited")
+            elif isinstance(error, TaskFailed):
+                self._failed_tasks += 1
+                self._decrease(f"task failed ({error})")
+            else:
+                self._errors += 1
+                if is_overload_error(error):
+                    self._decrease(f"overload ({type(error).__name__})")
+
+            self._condition.notify_all()
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        previous = self.limit
+        self._limit = max(self.min_limit, self._limit * self.backoff)
+        print(f"⚠️  Browser-Use concurrency {previous} -> {self.limit} ({reason})")
+
+    @staticmethod
+    def _ewma(current: float, sample: float, alpha: float = 0.2) -> float:
+        return sample if current == 0 else current + alpha * (sample - current)
+
+    def metrics(self) -> Dict:
+        with self._condition:
+            return {
+                'limit': self.limit,
+                'in_flight': self._in_flight,
+                'waiting': self._waiting,
+                'min_limit': self.min_limit,
+                'max_limit': self.max_limit,
+                'successes': self._successes,
+                'rate_limited': self._rate_limited,
+                'errors': self._errors,
+                'failed_tasks': self._failed_tasks,
+                'avg_latency_seconds': round(self._latency_ewma, 2),
+                'avg_queue_wait_seconds': round(self._queue_wait_ewma, 2)
+            }
@@ -0,0 +1,73 @@
+import os
+import json
+import re
+import time
+import uuid
+from typing import List, Dict
+
+from postprocess import clean_leads, parse_output
+
+EMAIL_PATTERN = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+PHONE_PATTERN = re.compile(r'\+?\d[\d\s().-]{6,}\d')
+
+DEFAULT_CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus', 'samples')
+
+
+def scrub_text(text: str) -> str:
+    """
+    Replace emails and phone numbers with placeholders of the same shape
+
+    Emails stay syntactically valid and phone numbers keep their length and
+    punctuation, so the scrubbed sample cleans to the same number of leads.
+    """
+    counter = iter(range(1, 1_000_000))
+    text = EMAIL_PATTERN.sub(lambda m: f"user{next(counter)}@example.com", text)
+    return PHONE_PATTERN.sub(lambda m: re.sub(r'\d', '5', m.group(0)), text)
+
+
+def scrub_output(output):
+    """Scrub PII from a raw task output, keeping its type (str, dict or list)"""
+    if isinstance(output, str):
+        return scrub_text(output)
+    return json.loads(scrub_text(json.dumps(output)))
+
+
+def capture_sample(output, cleaned_leads: List[Dict], query: str = '', directory: str = '') -> str:
+    """
+    Save a scrubbed raw task output to the replay corpus
+
+    The scrubbed output is cleaned again and stored as the sample's
+    expected leads, so replays check every field and not just the count;
+    expected_count comes from the unscrubbed run.
+
+    Returns:
+        Path of the written sample
+    """
+    directory = directory or os.getenv('LEAD_CORPUS_CAPTURE_DIR', '') or DEFAULT_CORPUS_DIR
+    os.makedirs(directory, exist_ok=True)
+    scrubbed = scrub_output(output)
+    sample = {
+        'name': f"captured-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}",
+        'query': scrub_text(query),
+        'output': scrubbed,
+        'expected_count': len(cleaned_leads),
+        'expected': clean_leads(parse_output(scrubbed))
+    }
+    path = os.path.join(directory, sample['name'] + '.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(sample, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_corpus(directory: str = '') -> List[Dict]:
+    """Load every sample in a corpus directory, sorted by name"""
+    directory = directory or DEFAULT_CORPUS_DIR
+    samples = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.json'):
+            continue
+        with open(os.path.join(directory, filename), encoding='utf-8') as f:
+            sample = json.load(f)
+        sample.setdefault('name', filename[:-5])
+        samples.append(sample)
+    return samples
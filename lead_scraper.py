@@ -1,7 +1,13 @@
 import os
-import json
 import re
-from typing import List, Dict
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Dict, Optional
+
+from concurrency import AdaptiveLimiter, TaskFailed
+from corpus import capture_sample
+from postprocess import PostProcessor, clean_leads, parse_step_leads, format_phone, format_url, format_email
+from serialization import LEAD_FIELDS
 
 try:
     from browser_use_sdk import BrowserUse
@@ -10,8 +16,100 @@ except ImportError:
     BrowserUse = None
     SDK_AVAILABLE = False
 
+NON_ALPHANUMERIC_PATTERN = re.compile(r'[^a-z0-9]+')
+
+
+def _normalize(text: str) -> str:
+    return NON_ALPHANUMERIC_PATTERN.sub(' ', text.lower()).strip()
+
+
+class _ReportedLeads:
+    """
+    Leads a progressive scrape has reported so far, in the order reported
+
+    Leads streamed from agent steps are provisional: they are often noted
+    before the agent visits the website, and their wording can differ from
+    the final output. A final-output lead for the same business (same name
+    and address, or failing that the same name) fills in their empty fields
+    instead of being dropped as a duplicate, and only final-output leads
+    count towards num_leads.
+    """
+
+    def __init__(self, num_leads: int, on_leads: Callable[[List[Dict]], None],
+                 on_update: Optional[Callable[[int, Dict], None]] = None):
+        self.num_leads = num_leads
+        self.on_leads = on_leads
+        self.on_update = on_update
+        self.leads: List[Dict] = []
+        self.final = set()
+        self.streamed = 0
+
+    def stream(self, leads: List[Dict]) -> None:
+        """Report leads the agent noted mid-task; step memory repeats earlier ones"""
+        new_leads = []
+        for lead in leads:
+            index = self._match(lead, by_name=False)
+            if index is not None:
+                self._fill(index, lead)
+            elif self.streamed < self.num_leads:
+                self.streamed += 1
+                new_leads.append(self._add(lead))
+        if new_leads:
+            self.on_leads(new_leads)
+
+    def finalize(self, leads: List[Dict]) -> None:
+        """Merge a task's final output into what was reported"""
+        new_leads = []
+        for lead in leads:
+            if len(self.final) >= self.num_leads:
+                break
+            index = self._match(lead)
+            if index in self.final:
+                # The same business twice, e.g. from overlapping shards
+                self._fill(index, lead)
+                continue
+            if index is None:
+                index = len(self.leads)
+                new_leads.append(self._add(lead))
+            else:
+                self._fill(index, lead)
+            self.final.add(index)
+        if new_leads:
+            self.on_leads(new_leads)
+
+    def _match(self, lead: Dict, by_name: bool = True) -> Optional[int]:
+        """Position of the same business, falling back to a not yet final lead with the same name"""
+        name = _normalize(lead['name'])
+        address = _normalize(lead['address'])
+        name_match = None
+        for index, reported in enumerate(self.leads):
+            if _normalize(reported['name']) != name:
+                continue
+            if _normalize(reported['address']) == address:
+                return index
+            if by_name and name_match is None and index not in self.final:
+                name_match = index
+        return name_match
+
+    def _add(self, lead: Dict) -> Dict:
+        self.leads.append(dict(lead))
+        return dict(lead)
+
+    def _fill(self, index: int, lead: Dict) -> None:
+        reported = self.leads[index]
+        missing = [field for field in LEAD_FIELDS if not reported.get(field) and lead.get(field)]
+        if not missing:
+            return
+        for field in missing:
+            reported[field] = lead[field]
+        if self.on_update is not None:
+            self.on_update(index, dict(reported))
+
+
 class LeadScraper:
     def __init__(self):
+        self.postprocessor = PostProcessor()
+        self.task_limiter = AdaptiveLimiter()
         api_key = os.getenv('BROWSER_USE_API_KEY')
         if not api_key:
             print("WARNING: BROWSER_USE_API_KEY not found. Using demo mode.")
@@ -24,7 +122,8 @@ class LeadScraper:
             self.client = BrowserUse(api_key=api_key)
             print("✅ SDK initialized successfully!")
     
-    def scrape_google_maps(self, query: str, num_leads: int = 20, require_email: bool = False) -> List[Dict]:
+    def scrape_google_maps(self, query: str, num_leads: int = 20, require_email: bool = False,
+                           start: int = 1, on_step: Optional[Callable] = None) -> List[Dict]:
         """
         Scrape Google Maps for business leads
         
@@ -32,17 +131,26 @@ class LeadScraper:
             query: Search query (e.g., "Restaurants in Singapore")
             num_leads: Number of leads to fetch (max 100)
             require_email: If True, visit websites to extract email addresses
+            start: Position of the first result to fetch (1 = top result)
+            on_step: Called with each agent step as it appears; the agent is
+                also asked to note every lead in its memory as it goes
         
         Returns:
             List of dictionaries containing lead information
         """
         
+        if start > 1:
+            results_scope = (f"business results {start} to {start + num_leads - 1} "
+                             f"(skip the first {start - 1} results)")
+        else:
+            results_scope = f"the first {num_leads} business results"
+        
         # Build task description based on email requirement
         if require_email:
             task_description = f"""
 Go to Google Maps (https://www.google.com/maps) and search for "{query}".
 
-For the first {num_leads} business results, extract the following information:
+For {results_scope}, extract the following information:
 1. Business Name
 2. Full Address  
 3. Phone Number (if available)
@@ -79,7 +187,7 @@ IMPORTANT: Return ONLY the JSON object above, nothing else. No introduction, no
             task_description = f"""
 Go to Google Maps (https://www.google.com/maps) and search for "{query}".
 
-For the first {num_leads} business results, extract the following information:
+For {results_scope}, extract the following information:
 1. Business Name
 2. Full Address  
 3. Phone Number (if available)
@@ -107,6 +215,14 @@ Format:
 }}
 
 IMPORTANT: Return ONLY the JSON object above, nothing else. No introduction, no conclusion, just the JSON.
+"""
+        
+        if on_step is not None:
+            task_description += """
+While you work: each time you finish with a business (after checking its website, if that is
+part of the task), add it to your memory as one line of JSON in the same shape as a lead above,
+e.g. {"name": "...", "address": "...", "phone": "...", "website": "...", "email": "..."}.
+Keep the leads you already noted in your memory. Still return the full JSON object at the end.
 """
         
         print(f"🔍 Creating task for query: {query}")
@@ -123,16 +239,30 @@ IMPORTANT: Return ONLY the JSON object above, nothing else. No introduction, no
             print("🚀 Sending task to Browser-Use Cloud...")
             print(f"📝 Task description length: {len(task_description)} chars")
             
-            # Create the task
-            task = self.client.tasks.create_task(
-                task=task_description
-            )
-            
-            print(f"✅ Task created with ID: {task.id}")
-            print(f"⏳ Waiting for browser automation to complete (this may take 1-3 minutes)...")
-            
-            # Wait for task completion
-            result = task.complete()
+            # Hold a slot from the adaptive limiter while the task is in flight
+            with self.task_limiter.slot() as slot:
+                # Create the task
+                task = self.client.tasks.create_task(
+                    task=task_description
+                )
+                
+                print(f"✅ Task created with ID: {task.id}")
+                print(f"⏳ Waiting for browser automation to complete (this may take 1-3 minutes)...")
+                
+                # Wait for task completion
+                if on_step is None:
+                    result = task.complete()
+                else:
+                    # Poll the task and hand over each new step as it appears
+                    steps_seen = 0
+                    for result in task.watch():
+                        for step in result.steps[steps_seen:]:
+                            on_step(step)
+                        steps_seen = max(steps_seen, len(result.steps))
+                
+                # A stopped/paused or unsuccessful task is provider-side trouble
+                if result.status != 'finished' or getattr(result, 'is_success', None) is False:
+                    slot.fail(TaskFailed(f"status={result.status}, is_success={getattr(result, 'is_success', None)}"))
             
             print(f"✅ Task completed successfully!")
             print(f"📄 Status: {result.status}")
@@ -144,53 +274,12 @@ IMPORTANT: Return ONLY the JSON object above, nothing else. No introduction, no
                 print(f"📝 Raw output type: {type(result.output)}")
                 print(f"📝 Raw output: {str(result.output)}")
                 
-                # Try to parse the output
-                if isinstance(result.output, str):
-                    # Try to find JSON in the output (might be wrapped in text)
-                    import re
-                    
-                    # Look for JSON object in the output
-                    json_match = re.search(r'\{[\s\S]*"leads"[\s\S]*\}', result.output)
-                    if json_match:
-                        try:
-                            output_data = json.loads(json_match.group(0))
-                            if isinstance(output_data, dict) and 'leads' in output_data:
-                                leads = output_data['leads']
-                                print(f"✅ Extracted {len(leads)} leads from JSON")
-                            else:
-                                print(f"⚠️  JSON found but no 'leads' key")
-                                leads = []
-                        except json.JSONDecodeError as e:
-                            print(f"⚠️  JSON parsing error: {e}")
-                            print(f"⚠️  Matched text: {json_match.group(0)[:200]}...")
-                            leads = []
-                    else:
-                        # Try direct JSON parse
-                        try:
-                            output_data = json.loads(result.output)
-                            if isinstance(output_data, dict) and 'leads' in output_data:
-                                leads = output_data['leads']
-                            elif isinstance(output_data, list):
-                                leads = output_data
-                            else:
-                                leads = []
-                        except json.JSONDecodeError:
-                            print(f"⚠️  Could not parse output as JSON")
-                            print(f"⚠️  Output was: {result.output[:500]}")
-                            leads = []
-                elif isinstance(result.output, dict) and 'leads' in result.output:
-                    leads = result.output['leads']
-                elif isinstance(result.output, list):
-                    leads = result.output
-                else:
-                    print(f"⚠️  Unexpected output type: {type(result.output)}")
-                    leads = []
+                # Parse and clean off the request thread for large outputs
+                cleaned_leads = self.postprocessor.parse_and_clean(result.output)
+                self._capture_output(result.output, cleaned_leads, query)
             else:
                 print("⚠️  No output received from task")
-                leads = []
-            
-            # Clean and validate leads
-            cleaned_leads = self._clean_leads(leads)
+                cleaned_leads = []
             
             print(f"✅ Successfully extracted {len(cleaned_leads)} leads")
             
@@ -213,51 +302,97 @@ IMPORTANT: Return ONLY the JSON object above, nothing else. No introduction, no
             # Re-raise the exception instead of returning sample data
             raise Exception(f"Browser-Use scraping failed: {str(e)}") from e
     
-    def _clean_leads(self, leads: List[Dict]) -> List[Dict]:
-        """Clean and validate lead data"""
-        cleaned = []
+    def scrape_google_maps_progressive(self, query: str, num_leads: int, require_email: bool,
+                                       on_leads: Callable[[List[Dict]], None],
+                                       on_update: Optional[Callable[[int, Dict], None]] = None) -> int:
+        """
+        Scrape while reporting leads as they come in
         
-        for lead in leads:
-            cleaned_lead = {
-                'name': lead.get('name', '').strip(),
-                'address': lead.get('address', '').strip(),
-                'phone': self._format_phone(lead.get('phone', '')),
-                'website': self._format_url(lead.get('website', '')),
-                'email': self._format_email(lead.get('email', ''))
-            }
+        Lets callers answer early with a partial result while the scrape
+        keeps running. Leads already reported are not reported again.
+        
+        By default a single task is streamed: the agent notes each lead in
+        its memory and those are reported step by step. The final output
+        then fills in fields the notes lacked (such as emails found later)
+        and adds the leads they missed. With LEAD_SHARD_SIZE set, the scrape is instead
+        split into ceil(num_leads / LEAD_SHARD_SIZE) concurrent tasks, which
+        multiplies provider cost and limiter slots, relies on the agent
+        honouring the result offsets, and can leave gaps that dedupe cannot
+        fill when result order shifts between tasks.
+        
+        Args:
+            query: Search query (e.g., "Restaurants in Singapore")
+            num_leads: Number of leads to fetch (max 100)
+            require_email: If True, visit websites to extract email addresses
+            on_leads: Called with each batch of new leads
+            on_update: Called with (position, lead) when a reported lead is
+                filled in; position counts all leads passed to on_leads
+        
+        Returns:
+            Total number of leads reported
+        """
+        reported = _ReportedLeads(num_leads, on_leads, on_update)
+        
+        shard_size = int(os.getenv('LEAD_SHARD_SIZE', 0))
+        if shard_size < 1:
+            def on_step(step) -> None:
+                reported.stream(clean_leads(parse_step_leads(step.memory)))
             
-            # Only include leads with at least a name
-            if cleaned_lead['name']:
-                cleaned.append(cleaned_lead)
+            try:
+                reported.finalize(self.scrape_google_maps(query, num_leads, require_email, on_step=on_step))
+            except Exception as e:
+                if not reported.leads:
+                    raise
+                print(f"⚠️  Task failed after {len(reported.leads)} streamed lead(s): {str(e)}")
+            return len(reported.leads)
+        
+        shards = [(start, min(shard_size, num_leads - start + 1))
+                  for start in range(1, num_leads + 1, shard_size)]
+        print(f"🧩 Splitting {num_leads} leads into {len(shards)} shard(s)")
+        
+        errors = []
+        with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+            futures = [pool.submit(self.scrape_google_maps, query, count, require_email, start)
+                       for start, count in shards]
+            for future in as_completed(futures):
+                try:
+                    leads = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                reported.finalize(leads)
         
-        return cleaned
+        if not reported.leads and errors:
+            raise errors[0]
+        if errors:
+            print(f"⚠️  {len(errors)} of {len(shards)} shard(s) failed: {str(errors[0])}")
+        return len(reported.leads)
+    
+    def _capture_output(self, output, cleaned_leads: List[Dict], query: str) -> None:
+        """Save a scrubbed copy of the raw output to the replay corpus, if enabled"""
+        if not os.getenv('LEAD_CORPUS_CAPTURE_DIR'):
+            return
+        try:
+            path = capture_sample(output, cleaned_leads, query)
+            print(f"💾 Captured output sample: {path}")
+        except Exception as e:
+            print(f"⚠️  Could not capture output sample: {str(e)}")
+    
+    def _clean_leads(self, leads: List[Dict]) -> List[Dict]:
+        """Clean and validate lead data"""
+        return self.postprocessor.clean(leads)
     
     def _format_phone(self, phone: str) -> str:
         """Format phone number"""
-        if not phone:
-            return ''
-        # Remove extra spaces and clean up
-        phone = re.sub(r'\s+', ' ', phone.strip())
-        return phone
+        return format_phone(phone)
     
     def _format_url(self, url: str) -> str:
         """Format URL"""
-        if not url:
-            return ''
-        url = url.strip()
-        if url and not url.startswith('http'):
-            url = 'https://' + url
-        return url
+        return format_url(url)
     
     def _format_email(self, email: str) -> str:
         """Format and validate email"""
-        if not email:
-            return ''
-        email = email.strip().lower()
-        # Basic email validation
-        if re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email):
-            return email
-        return ''
+        return format_email(email)
     
     def _parse_output(self, output) -> List[Dict]:
         """Parse various output formats"""
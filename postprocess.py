@@ -0,0 +1,248 @@
+import os
+import json
+import re
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, List, Dict, Optional
+
+from serialization import LEAD_FIELDS
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+LEADS_JSON_PATTERN = re.compile(r'\{[\s\S]*"leads"[\s\S]*\}')
+# One flat JSON object with a "name" key, as the agent notes each lead mid-task
+LEAD_OBJECT_PATTERN = re.compile(r'\{[^{}]*"name"[^{}]*\}')
+
+
+def _silent(message: str) -> None:
+    pass
+
+
+def parse_output(output, log: Optional[Callable[[str], None]] = None) -> List[Dict]:
+    """
+    Extract the raw lead list from a Browser-Use task output
+
+    Handles JSON wrapped in text, bare JSON, and outputs that are already
+    a dict or list. Diagnostics go to log, which is silent by default so
+    worker processes never write to stdout.
+    """
+    log = log or _silent
+    if isinstance(output, str):
+        # Look for JSON object in the output (might be wrapped in text)
+        json_match = LEADS_JSON_PATTERN.search(output)
+        if json_match:
+            try:
+                output_data = json.loads(json_match.group(0))
+                if isinstance(output_data, dict) and 'leads' in output_data:
+                    leads = output_data['leads']
+                    log(f"✅ Extracted {len(leads)} leads from JSON")
+                    return leads
+                log(f"⚠️  JSON found but no 'leads' key")
+                return []
+            except json.JSONDecodeError as e:
+                log(f"⚠️  JSON parsing error: {e}")
+                log(f"⚠️  Matched text: {json_match.group(0)[:200]}...")
+                return []
+
+        # Try direct JSON parse
+        try:
+            output_data = json.loads(output)
+        except json.JSONDecodeError:
+            log(f"⚠️  Could not parse output as JSON")
+            log(f"⚠️  Output was: {output[:500]}")
+            return []
+        if isinstance(output_data, dict) and 'leads' in output_data:
+            return output_data['leads']
+        if isinstance(output_data, list):
+            return output_data
+        return []
+
+    if isinstance(output, dict) and 'leads' in output:
+        return output['leads']
+    if isinstance(output, list):
+        return output
+
+    log(f"⚠️  Unexpected output type: {type(output)}")
+    return []
+
+
+def parse_step_leads(text: str) -> List[Dict]:
+    """
+    Pull the leads an agent has noted so far out of a step's memory text
+
+    Each lead is expected as a single-line JSON object; anything that
+    does not parse is skipped, as is a step with no leads in it.
+    """
+    leads = []
+    for match in LEAD_OBJECT_PATTERN.finditer(text or ''):
+        try:
+            lead = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            continue
+        if isinstance(lead, dict):
+            leads.append({field: str(lead.get(field) or '') for field in LEAD_FIELDS})
+    return leads
+
+
+def format_phone(phone: str) -> str:
+    """Format phone number"""
+    if not phone:
+        return ''
+    # Remove extra spaces and clean up
+    return WHITESPACE_PATTERN.sub(' ', phone.strip())
+
+
+def format_url(url: str) -> str:
+    """Format URL"""
+    if not url:
+        return ''
+    url = url.strip()
+    if url and not url.startswith('http'):
+        url = 'https://' + url
+    return url
+
+
+def format_email(email: str) -> str:
+    """Format and validate email"""
+    if not email:
+        return ''
+    email = email.strip().lower()
+    # Basic email validation
+    if EMAIL_PATTERN.match(email):
+        return email
+    return ''
+
+
+def to_rows(leads: List[Dict]) -> List[tuple]:
+    """Pack leads as tuples in LEAD_FIELDS order so they pickle compactly"""
+    return [tuple(lead.get(field, '') for field in LEAD_FIELDS) for lead in leads]
+
+
+def from_rows(rows: List[tuple]) -> List[Dict]:
+    return [dict(zip(LEAD_FIELDS, row)) for row in rows]
+
+
+def clean_rows(rows: List[tuple]) -> List[tuple]:
+    """Clean and validate packed leads, dropping any without a name"""
+    cleaned = []
+    for name, address, phone, website, email in rows:
+        name = name.strip()
+        # Only include leads with at least a name
+        if name:
+            cleaned.append((
+                name,
+                address.strip(),
+                format_phone(phone),
+                format_url(website),
+                format_email(email)
+            ))
+    return cleaned
+
+
+def clean_leads(leads: List[Dict]) -> List[Dict]:
+    """Clean and validate lead data"""
+    return from_rows(clean_rows(to_rows(leads)))
+
+
+def parse_and_clean_rows(output) -> List[tuple]:
+    """Worker entry point: parse a raw task output and return cleaned rows"""
+    return clean_rows(to_rows(parse_output(output)))
+
+
+def default_start_method() -> str:
+    """forkserver where the platform has it, spawn otherwise (never fork)"""
+    methods = multiprocessing.get_all_start_methods()
+    return 'forkserver' if 'forkserver' in methods else 'spawn'
+
+
+class PostProcessor:
+    """
+    Runs CPU-bound lead parsing and cleaning in a process pool
+
+    Keeps very large outputs and merges off the request threads so they do
+    not compete for the GIL with in-flight scrapes. Small inputs are handled
+    inline because shipping them to a worker costs more than the work.
+
+    The pool is off unless LEAD_POSTPROCESS_WORKERS is set: a full 100-lead
+    output (about 24 KB) parses and cleans in about 1 ms inline, which is
+    less than a round trip to a worker, and nothing merges several tasks'
+    leads yet. The thresholds are sized for that kind of merged workload.
+
+    Workers are started with forkserver (or spawn) rather than fork: the
+    server process is threaded, and a forked child could inherit a lock,
+    such as stdout's, held by another thread and hang. If the pool stalls
+    or breaks, the work is redone inline so a request never waits on it
+    for longer than the timeout.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        if workers is None:
+            workers = int(os.getenv('LEAD_POSTPROCESS_WORKERS', 0))
+        self.workers = workers
+        self.chunk_size = int(os.getenv('LEAD_POSTPROCESS_CHUNK_SIZE', 250))
+        self.min_batch = int(os.getenv('LEAD_POSTPROCESS_MIN_BATCH', 500))
+        self.min_output_chars = int(os.getenv('LEAD_POSTPROCESS_MIN_OUTPUT_CHARS', 65536))
+        self.start_method = os.getenv('LEAD_POSTPROCESS_START_METHOD', '') or default_start_method()
+        self.timeout = float(os.getenv('LEAD_POSTPROCESS_TIMEOUT', 30))
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers < 1:
+            return None
+        with self._lock:
+            if self._pool is None:
+                context = multiprocessing.get_context(self.start_method)
+                if self.start_method == 'forkserver':
+                    # Only this module is needed; skip importing the app into the server
+                    context.set_forkserver_preload(['postprocess'])
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                print(f"⚙️  Post-processing pool started with {self.workers} "
+                      f"{self.start_method} workers")
+            return self._pool
+
+    def parse_and_clean(self, output) -> List[Dict]:
+        """Parse a raw task output and clean the leads it contains"""
+        pool = None
+        if isinstance(output, str) and len(output) >= self.min_output_chars:
+            pool = self._get_pool()
+        if pool is not None:
+            try:
+                return from_rows(pool.submit(parse_and_clean_rows, output).result(timeout=self.timeout))
+            except (FutureTimeoutError, BrokenProcessPool) as e:
+                self._discard_pool(pool, e)
+                return clean_leads(parse_output(output, print))
+        return self.clean(parse_output(output, print))
+
+    def clean(self, leads: List[Dict]) -> List[Dict]:
+        """Clean leads, fanning large batches out across the pool in chunks"""
+        pool = self._get_pool() if len(leads) >= self.min_batch else None
+        if pool is None:
+            return clean_leads(leads)
+
+        rows = to_rows(leads)
+        chunks = [rows[start:start + self.chunk_size] for start in range(0, len(rows), self.chunk_size)]
+        cleaned = []
+        try:
+            for chunk in pool.map(clean_rows, chunks, timeout=self.timeout):
+                cleaned.extend(chunk)
+        except (FutureTimeoutError, BrokenProcessPool) as e:
+            self._discard_pool(pool, e)
+            return clean_leads(leads)
+        return from_rows(cleaned)
+
+    def _discard_pool(self, pool: ProcessPoolExecutor, error: Exception) -> None:
+        """Drop a stalled or broken pool; the next large batch starts a fresh one"""
+        print(f"⚠️  Post-processing pool failed ({type(error).__name__}), running inline")
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
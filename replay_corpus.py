@@ -0,0 +1,172 @@
+"""
+Replay recorded Browser-Use outputs through the parse -> clean pipeline
+Checks that every sample still cleans to exactly its recorded leads and
+that parsing has not become slower or more allocation-heavy than the baseline
+
+Usage:
+    python replay_corpus.py                    # check against corpus/baseline.json
+    python replay_corpus.py --update-baseline  # record new baseline on this machine
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from contextlib import redirect_stdout
+
+from corpus import load_corpus, DEFAULT_CORPUS_DIR
+from postprocess import PostProcessor
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(DEFAULT_CORPUS_DIR), 'baseline.json')
+ROUNDS = 5
+
+def run_once(processor, sample):
+    """Parse and clean one sample, returning the leads and peak traced memory"""
+    # Warm up first so one-off caches are not counted against the sample
+    processor.parse_and_clean(sample['output'])
+    tracemalloc.start()
+    leads = processor.parse_and_clean(sample['output'])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return leads, peak / 1024
+
+def time_samples(processor, samples, iterations):
+    """
+    Best time per run for every sample
+
+    Rounds are interleaved across samples so a noisy moment on the machine
+    hits all of them instead of reading as a regression in one.
+    """
+    best = [float('inf')] * len(samples)
+    for _ in range(ROUNDS):
+        for index, sample in enumerate(samples):
+            output = sample['output']
+            start = time.perf_counter()
+            for _ in range(iterations):
+                processor.parse_and_clean(output)
+            best[index] = min(best[index], (time.perf_counter() - start) / iterations)
+    return best
+
+def describe_difference(leads, expected):
+    """Point at the first lead and field that no longer match the recorded expectation"""
+    for index, (lead, wanted) in enumerate(zip(leads, expected)):
+        for field in wanted:
+            if lead.get(field) != wanted[field]:
+                return f"lead {index} {field}: got {lead.get(field)!r}, expected {wanted[field]!r}"
+    return f"got {len(leads)} leads, expected {len(expected)}"
+
+def check_sample(sample, result, baseline, tolerance):
+    """
+    Check one sample against its expectations and baseline
+
+    Returns:
+        (failures, warnings) lists of messages. Lost leads and extra memory
+        fail; per-sample slowdowns only warn because tiny samples are noisy.
+    """
+    failures = []
+    warnings = []
+    expected_count = sample.get('expected_count', 0)
+    if result['count'] < expected_count:
+        failures.append(f"recovered {result['count']} leads, expected {expected_count}")
+    if 'expected' not in sample:
+        failures.append("no expected leads recorded")
+    elif result['leads'] != sample['expected']:
+        failures.append(describe_difference(result['leads'], sample['expected']))
+
+    if baseline:
+        if result['seconds_per_run'] > baseline['seconds_per_run'] * (1 + tolerance):
+            slowdown = result['seconds_per_run'] / baseline['seconds_per_run'] - 1
+            warnings.append(f"{slowdown:.0%} slower than baseline")
+        if result['peak_kb'] > baseline['peak_kb'] * (1 + tolerance):
+            failures.append(f"peak memory {result['peak_kb']:.1f} KB vs baseline {baseline['peak_kb']:.1f} KB")
+    return failures, warnings
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the output corpus through parse -> clean")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS_DIR, help="Directory of recorded samples")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline timings file")
+    parser.add_argument('--iterations', type=int, default=100, help="Timed runs per sample per round")
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help="Allowed slowdown / extra memory over baseline (0.3 = 30%%)")
+    parser.add_argument('--update-baseline', action='store_true', help="Write current figures as the baseline")
+    args = parser.parse_args()
+
+    samples = load_corpus(args.corpus)
+    baselines = {}
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baselines = json.load(f)
+
+    # Measure the pipeline itself, not process pool overhead
+    processor = PostProcessor(workers=0)
+
+    print("=" * 78)
+    print(f"Corpus replay - {len(samples)} samples, best of {ROUNDS} rounds x {args.iterations} runs")
+    print("=" * 78)
+    print(f"{'sample':<24}{'leads':>7}{'expected':>10}{'us/run':>11}{'leads/sec':>13}{'peak KB':>10}  result")
+
+    # The parser logs as it goes; keep that out of the timings and the report
+    with redirect_stdout(io.StringIO()):
+        runs = [run_once(processor, sample) for sample in samples]
+        timings = time_samples(processor, samples, args.iterations)
+
+    results = {}
+    failed = 0
+    for sample, (leads, peak_kb), seconds_per_run in zip(samples, runs, timings):
+        result = {
+            'leads': leads,
+            'count': len(leads),
+            'seconds_per_run': seconds_per_run,
+            'leads_per_sec': len(leads) / seconds_per_run if seconds_per_run else 0.0,
+            'peak_kb': peak_kb
+        }
+        results[sample['name']] = result
+        failures, warnings = check_sample(sample, result, baselines.get(sample['name']), args.tolerance)
+        failed += bool(failures)
+        if failures:
+            status = 'FAIL: ' + '; '.join(failures + warnings)
+        elif warnings:
+            status = 'warn: ' + '; '.join(warnings)
+        else:
+            status = 'ok'
+        print(f"{sample['name']:<24}{result['count']:>7}{sample.get('expected_count', 0):>10}"
+              f"{result['seconds_per_run'] * 1e6:>11.1f}{result['leads_per_sec']:>13,.0f}"
+              f"{result['peak_kb']:>10.1f}  {status}")
+
+    total_leads = sum(result['count'] for result in results.values())
+    total_seconds = sum(result['seconds_per_run'] for result in results.values())
+    print("-" * 78)
+    print(f"Overall: {total_leads / total_seconds if total_seconds else 0:,.0f} leads/sec")
+
+    # Throughput is gated on the whole corpus, which is far less noisy than any one sample
+    compared = [name for name in results if name in baselines]
+    if compared:
+        current = sum(results[name]['seconds_per_run'] for name in compared)
+        recorded = sum(baselines[name]['seconds_per_run'] for name in compared)
+        change = current / recorded - 1
+        print(f"Corpus time vs baseline: {change:+.0%}")
+        if change > args.tolerance:
+            print(f"❌ Parsing is {change:.0%} slower than baseline (tolerance {args.tolerance:.0%})")
+            failed += 1
+
+    if args.update_baseline:
+        baseline = {
+            name: {'seconds_per_run': result['seconds_per_run'], 'peak_kb': result['peak_kb']}
+            for name, result in results.items()
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if failed:
+        print(f"❌ {failed} check(s) failed")
+        return 1
+    print("✅ All samples passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+import os
+import json
+import random
+import socket
+import ipaddress
+import smtplib
+import sqlite3
+import threading
+import time
+from email.message import EmailMessage
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+
+def check_callback_url(url: str) -> None:
+    """
+    Make sure a callback URL points at a public http(s) host
+
+    Hosts listed in CALLBACK_ALLOWED_HOSTS (comma separated) are always
+    accepted, e.g. an n8n instance on the same private network.
+
+    Raises:
+        ValueError: If the URL is malformed or resolves to a loopback,
+            link-local, private or otherwise non-public address
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise ValueError('callback_url must be an http(s) URL')
+
+    host = parsed.hostname.lower()
+    allowed = [h.strip().lower() for h in os.getenv('CALLBACK_ALLOWED_HOSTS', '').split(',') if h.strip()]
+    if host in allowed:
+        return
+
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parsed.port or None)}
+    except (socket.gaierror, UnicodeError):
+        raise ValueError(f"callback_url host '{host}' could not be resolved")
+
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"callback_url host '{host}' resolves to a non-public address")
+
+
+class ResultDispatcher:
+    """
+    Background delivery of scrape results to callback URLs and email
+
+    Results are written to a persistent SQLite outbox first, so nothing is
+    lost if the process restarts before delivery. A daemon thread groups
+    pending results by destination, sends each group as one batch and
+    retries failed batches with exponential backoff. Results that run out
+    of attempts are kept as dead rows for inspection and purged once they
+    are older than DELIVERY_DEAD_RETENTION seconds.
+    """
+
+    def __init__(self, outbox_path: Optional[str] = None):
+        self.outbox_path = outbox_path or os.getenv('RESULT_OUTBOX_PATH', 'outbox.db')
+        self.batch_window = float(os.getenv('DELIVERY_BATCH_WINDOW', 5))
+        self.max_batch_size = int(os.getenv('DELIVERY_MAX_BATCH_SIZE', 20))
+        self.max_attempts = int(os.getenv('DELIVERY_MAX_ATTEMPTS', 6))
+        self.base_backoff = float(os.getenv('DELIVERY_BASE_BACKOFF', 2))
+        self.max_backoff = float(os.getenv('DELIVERY_MAX_BACKOFF', 300))
+        self.callback_timeout = float(os.getenv('DELIVERY_CALLBACK_TIMEOUT', 15))
+        self.dead_retention = float(os.getenv('DELIVERY_DEAD_RETENTION', 7 * 24 * 3600))
+
+        self.smtp_host = os.getenv('SMTP_HOST', '')
+        self.smtp_port = int(os.getenv('SMTP_PORT', 587))
+        self.smtp_user = os.getenv('SMTP_USER', '')
+        self.smtp_password = os.getenv('SMTP_PASSWORD', '')
+        self.smtp_from = os.getenv('SMTP_FROM', self.smtp_user)
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._next_purge = 0.0
+
+        self._conn = sqlite3.connect(self.outbox_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel TEXT NOT NULL,
+                    destination TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT NOT NULL DEFAULT '',
+                    dead INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            self._conn.commit()
+
+    @property
+    def email_enabled(self) -> bool:
+        return bool(self.smtp_host and self.smtp_from)
+
+    def enqueue(self, result: Dict, callback_url: str = '', email: str = '') -> None:
+        """Store a result in the outbox for every requested destination"""
+        now = time.time()
+        payload = json.dumps(result)
+        rows = []
+        if callback_url:
+            rows.append(('callback', callback_url, payload, now, now))
+        if email and self.email_enabled:
+            rows.append(('email', email, payload, now, now))
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO outbox (channel, destination, payload, created_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='result-dispatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pending, dead = self._conn.execute(
+                "SELECT COALESCE(SUM(dead = 0), 0), COALESCE(SUM(dead = 1), 0) FROM outbox"
+            ).fetchone()
+        return {'pending': pending, 'dead': dead}
+
+    def purge_dead(self) -> int:
+        """
+        Delete dead results older than the retention period
+
+        Returns:
+            Number of rows deleted
+        """
+        cutoff = time.time() - self.dead_retention
+        with self._lock:
+            deleted = self._conn.execute(
+                "DELETE FROM outbox WHERE dead = 1 AND created_at < ?", (cutoff,)
+            ).rowcount
+            self._conn.commit()
+        if deleted:
+            print(f"🗑️  Purged {deleted} undeliverable result(s) from the outbox")
+        return deleted
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                # Dead rows still hold full lead payloads; check for old ones hourly
+                if time.time() >= self._next_purge:
+                    self.purge_dead()
+                    self._next_purge = time.time() + 3600
+                next_wake = self.dispatch_due()
+            except Exception as e:
+                print(f"❌ Result dispatcher error: {str(e)}")
+                next_wake = self.batch_window
+            self._wakeup.wait(timeout=max(0.1, next_wake))
+            self._wakeup.clear()
+
+    def dispatch_due(self) -> float:
+        """
+        Deliver every batch that is ready
+
+        A destination is ready once its oldest due result has waited for the
+        batch window or it has a full batch queued.
+
+        Returns:
+            Seconds until the next batch could become ready
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, channel, destination, payload, created_at, attempts FROM outbox "
+                "WHERE dead = 0 AND next_attempt_at <= ? ORDER BY id",
+                (now,)
+            ).fetchall()
+            next_retry = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE dead = 0 AND next_attempt_at > ?",
+                (now,)
+            ).fetchone()[0]
+
+        groups: Dict[Tuple[str, str], List[tuple]] = {}
+        for row in rows:
+            groups.setdefault((row[1], row[2]), []).append(row)
+
+        next_wake = self.batch_window
+        if next_retry is not None:
+            next_wake = min(next_wake, next_retry - now)
+
+        for (channel, destination), group in groups.items():
+            oldest = group[0][4]
+            # Rows that already failed once go out immediately on retry
+            ready = (
+                len(group) >= self.max_batch_size
+                or now - oldest >= self.batch_window
+                or any(row[5] > 0 for row in group)
+            )
+            if not ready:
+                next_wake = min(next_wake, self.batch_window - (now - oldest))
+                continue
+
+            for start in range(0, len(group), self.max_batch_size):
+                self._deliver_batch(channel, destination, group[start:start + self.max_batch_size])
+
+        return next_wake
+
+    def _deliver_batch(self, channel: str, destination: str, batch: List[tuple]) -> None:
+        ids = [row[0] for row in batch]
+        results = [json.loads(row[3]) for row in batch]
+
+        try:
+            if channel == 'callback':
+                self._send_callback(destination, results)
+            else:
+                self._send_email(destination, results)
+        except Exception as e:
+            self._record_failure(batch, str(e))
+            return
+
+        print(f"📬 Delivered {len(results)} result(s) via {channel} to {destination}")
+        with self._lock:
+            self._conn.execute(
+                f"DELETE FROM outbox WHERE id IN ({','.join('?' * len(ids))})", ids
+            )
+            self._conn.commit()
+
+    def _record_failure(self, batch: List[tuple], error: str) -> None:
+        now = time.time()
+        updates = []
+        for row in batch:
+            attempts = row[5] + 1
+            delay = min(self.max_backoff, self.base_backoff * (2 ** (attempts - 1)))
+            delay *= random.uniform(0.5, 1.0)
+            dead = 1 if attempts >= self.max_attempts else 0
+            updates.append((attempts, now + delay, error[:500], dead, row[0]))
+
+        print(f"⚠️  Delivery to {batch[0][2]} failed ({error}), will retry")
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ?, dead = ? "
+                "WHERE id = ?",
+                updates
+            )
+            self._conn.commit()
+
+    def _send_callback(self, url: str, results: List[Dict]) -> None:
+        # Checked again here because DNS may have changed since the request
+        check_callback_url(url)
+        response = httpx.post(
+            url,
+            json={'results': results, 'count': len(results)},
+            timeout=self.callback_timeout
+        )
+        response.raise_for_status()
+
+    def _send_email(self, address: str, results: List[Dict]) -> None:
+        message = EmailMessage()
+        message['From'] = self.smtp_from
+        message['To'] = address
+        total = sum(result.get('count', 0) for result in results)
+        message['Subject'] = f"Your leads are ready ({total} leads)"
+
+        lines = []
+        for result in results:
+            lines.append(f"Query: {result.get('query', '')}")
+            if not result.get('success'):
+                lines.append(f"Error: {result.get('error', 'unknown error')}")
+            for lead in result.get('leads', []):
+                lines.append(f"- {lead['name']} | {lead['address']} | {lead['phone']} | "
+                             f"{lead['website']} | {lead['email']}")
+            lines.append('')
+        message.set_content('\n'.join(lines))
+        message.add_attachment(
+            json.dumps(results, indent=2).encode('utf-8'),
+            maintype='application', subtype='json', filename='leads.json'
+        )
+
+        with smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=30) as smtp:
+            smtp.starttls()
+            if self.smtp_user:
+                smtp.login(self.smtp_user, self.smtp_password)
+            smtp.send_message(message)
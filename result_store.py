@@ -0,0 +1,165 @@
+import os
+import base64
+import time
+import threading
+import uuid
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
+
+
+class ResultStore:
+    """
+    In-memory store of scrape results
+
+    Keeps the most recent results so they can be served page by page
+    instead of as one large response. Entries expire after a TTL and the
+    oldest are evicted once the store is full. A result can also be filled
+    in while its scrape is still running, with readers waiting for it to
+    grow.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_results: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else float(os.getenv('RESULT_STORE_TTL', 3600))
+        self.max_results = max_results or int(os.getenv('RESULT_STORE_MAX', 200))
+        self._results: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._condition = threading.Condition()
+
+    def save(self, leads: List[Dict], query: str = '') -> str:
+        """Store a finished result and return its ID"""
+        return self._add(list(leads), query, 'complete')
+
+    def create(self, query: str = '') -> str:
+        """Start an empty result that is filled in with append() and finish()"""
+        return self._add([], query, 'running')
+
+    def _add(self, leads: List[Dict], query: str, status: str) -> str:
+        result_id = uuid.uuid4().hex
+        with self._condition:
+            self._evict()
+            self._results[result_id] = {
+                'query': query,
+                'leads': leads,
+                'status': status,
+                'error': '',
+                'created_at': time.time()
+            }
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return result_id
+
+    def append(self, result_id: str, leads: List[Dict]) -> None:
+        with self._condition:
+            result = self._results.get(result_id)
+            if result is not None:
+                result['leads'].extend(leads)
+                self._condition.notify_all()
+
+    def update(self, result_id: str, index: int, lead: Dict) -> None:
+        """Replace one lead of a running result, e.g. once more of its fields are known"""
+        with self._condition:
+            result = self._results.get(result_id)
+            if result is not None and 0 <= index < len(result['leads']):
+                result['leads'][index] = lead
+                self._condition.notify_all()
+
+    def finish(self, result_id: str, error: str = '') -> None:
+        """Mark a running result as complete, or failed if an error is given"""
+        with self._condition:
+            result = self._results.get(result_id)
+            if result is not None:
+                result['status'] = 'failed' if error else 'complete'
+                result['error'] = error
+                self._condition.notify_all()
+
+    def wait(self, result_id: str, min_leads: int, timeout: Optional[float] = None) -> Optional[Dict]:
+        """
+        Block until a result has min_leads leads, stops running, or the timeout passes
+
+        Returns:
+            A snapshot of the result, or None if it is unknown or expired
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                result = self._results.get(result_id)
+                if result is None:
+                    return None
+                if result['status'] != 'running' or len(result['leads']) >= min_leads:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return dict(result, leads=list(result['leads']))
+
+    def get(self, result_id: str) -> Optional[Dict]:
+        """Snapshot of a stored result, or None if it is unknown or expired"""
+        with self._condition:
+            self._evict()
+            result = self._results.get(result_id)
+            if result is None:
+                return None
+            return dict(result, leads=list(result['leads']))
+
+    def status(self, result_id: str) -> Optional[Dict]:
+        """Status ('running', 'complete' or 'failed') and error of a result, without its leads"""
+        with self._condition:
+            result = self._results.get(result_id)
+            if result is None:
+                return None
+            return {'status': result['status'], 'error': result['error'], 'total': len(result['leads'])}
+
+    def page(self, result_id: str, limit: int, cursor: str = '') -> Optional[Tuple[List[Dict], int, str]]:
+        """
+        Get one page of a stored result
+
+        Args:
+            result_id: ID returned by save()
+            limit: Maximum number of leads in the page
+            cursor: Opaque cursor from a previous page, empty for the first page
+
+        Returns:
+            (leads, total, next_cursor) or None if the result is unknown or expired.
+            next_cursor is empty on the last page of a finished result; while
+            the result is still running it points past the leads seen so far.
+        """
+        offset = decode_cursor(cursor)
+        with self._condition:
+            self._evict()
+            result = self._results.get(result_id)
+            if result is None:
+                return None
+            leads = result['leads']
+            page = leads[offset:offset + limit]
+            total = len(leads)
+            running = result['status'] == 'running'
+
+        end = offset + len(page)
+        next_cursor = encode_cursor(end) if end < total or running else ''
+        return page, total, next_cursor
+
+    def _evict(self) -> None:
+        cutoff = time.time() - self.ttl
+        while self._results:
+            result_id, result = next(iter(self._results.items()))
+            if result['created_at'] >= cutoff:
+                break
+            del self._results[result_id]
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    """Turn a cursor back into an offset, raising ValueError if it is malformed"""
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        offset = int(base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii'))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if offset < 0:
+        raise ValueError('Invalid cursor')
+    return offset
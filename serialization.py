@@ -0,0 +1,165 @@
+import json
+import gzip
+from typing import Dict, List, Tuple
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+LEAD_FIELDS = ['name', 'address', 'phone', 'website', 'email']
+
+FORMATS = ('json', 'compact', 'msgpack')
+
+MSGPACK_MIME_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+# Bodies smaller than this are not worth the compression overhead
+MIN_COMPRESS_SIZE = 1024
+
+
+def available_encodings() -> List[str]:
+    """Content encodings we can produce, most preferred first"""
+    encodings = []
+    if ZSTD_AVAILABLE:
+        encodings.append('zstd')
+    if BROTLI_AVAILABLE:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+
+def parse_quality_list(header: str) -> Dict[str, float]:
+    """Map each lower-cased value of an Accept-style header to its q-value"""
+    accepted = {}
+    for part in (header or '').split(','):
+        pieces = part.strip().split(';')
+        name = pieces[0].strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in pieces[1:]:
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    """
+    Pick a content encoding from an Accept-Encoding header
+
+    Returns:
+        The chosen encoding, or 'identity' when the client accepts none we support
+    """
+    accepted = parse_quality_list(accept_encoding)
+
+    best, best_quality = 'identity', 0.0
+    for encoding in available_encodings():
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def negotiate_format(requested: str = '', accept: str = '') -> str:
+    """
+    Pick a response format from an explicit request or the Accept header
+
+    Raises:
+        ValueError: If the format is unknown or its library is not installed
+    """
+    fmt = (requested or '').strip().lower()
+    if not fmt:
+        # msgpack only when named explicitly and not ranked below JSON
+        accepted = parse_quality_list(accept)
+        msgpack_quality = max(accepted.get(mime, 0.0) for mime in MSGPACK_MIME_TYPES)
+        json_quality = accepted.get('application/json', 0.0)
+        fmt = 'msgpack' if msgpack_quality > 0 and msgpack_quality >= json_quality else 'json'
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}', expected one of: {', '.join(FORMATS)}")
+    if fmt == 'msgpack' and not MSGPACK_AVAILABLE:
+        raise ValueError("msgpack format requested but the msgpack package is not installed")
+    return fmt
+
+
+def to_compact(payload: Dict) -> Dict:
+    """Send lead field names once and each lead as an array of values"""
+    compact = dict(payload)
+    compact['fields'] = LEAD_FIELDS
+    compact['leads'] = [[lead.get(field, '') for field in LEAD_FIELDS] for lead in payload.get('leads', [])]
+    return compact
+
+
+def dumps_json(payload: Dict) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def encode(payload: Dict, fmt: str = 'json') -> Tuple[bytes, str]:
+    """
+    Serialize a response payload
+
+    Returns:
+        (body, content_type)
+    """
+    if fmt == 'msgpack':
+        return msgpack.packb(to_compact(payload), use_bin_type=True), 'application/msgpack'
+    if fmt == 'compact':
+        payload = to_compact(payload)
+    return dumps_json(payload), 'application/json'
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(body)
+    if encoding == 'br':
+        return brotli.compress(body, quality=4)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def serialize(payload: Dict, fmt: str = 'json', accept_encoding: str = '') -> Tuple[bytes, Dict[str, str]]:
+    """
+    Serialize and, if the client allows it, compress a response payload
+
+    Returns:
+        (body, headers) ready to be sent as an HTTP response
+    """
+    body, content_type = encode(payload, fmt)
+    headers = {'Content-Type': content_type, 'Vary': 'Accept, Accept-Encoding'}
+
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= MIN_COMPRESS_SIZE else 'identity'
+    if encoding != 'identity':
+        body = compress(body, encoding)
+        headers['Content-Encoding'] = encoding
+    return body, headers
@@ -1,4 +1,11 @@
+// Leads loaded so far; the rest of the stored result is fetched page by page
 let currentLeads = [];
+let currentResult = { resultId: null, total: 0, nextCursor: '', loading: null };
+
+const PAGE_SIZE = 50;
+const ROW_HEIGHT = 44;
+const OVERSCAN_ROWS = 10;
+let renderScheduled = false;
 
 document.getElementById('leadForm').addEventListener('submit', async (e) => {
     e.preventDefault();
@@ -26,7 +33,8 @@ document.getElementById('leadForm').addEventListener('submit', async (e) => {
                 query: query,
                 num_leads: numLeads,
                 email: email,
-                require_email: requireEmail
+                require_email: requireEmail,
+                limit: PAGE_SIZE
             })
         });
         
@@ -36,8 +44,14 @@ document.getElementById('leadForm').addEventListener('submit', async (e) => {
             throw new Error(data.error || 'Failed to fetch leads');
         }
         
-        // Store leads for export
+        // Keep the first page; further pages are fetched while scrolling
         currentLeads = data.leads;
+        currentResult = {
+            resultId: data.result_id,
+            total: data.total,
+            nextCursor: data.next_cursor,
+            loading: null
+        };
         
         // Display results
         displayResults(data);
@@ -58,32 +72,70 @@ function displayResults(data) {
     
     // Summary
     summaryDiv.innerHTML = `
-        <p><strong>Query:</strong> ${document.getElementById('query').value}</p>
-        <p><strong>Leads Found:</strong> ${data.count}</p>
-        <p><strong>Results sent to:</strong> ${data.email}</p>
+        <p><strong>Query:</strong> ${escapeHtml(document.getElementById('query').value)}</p>
+        <p><strong>Leads Found:</strong> ${data.total}</p>
+        <p><strong>Results sent to:</strong> ${escapeHtml(data.email)}</p>
     `;
     
-    // Table
-    if (data.leads && data.leads.length > 0) {
-        let tableHTML = `
-            <table class="lead-table">
-                <thead>
-                    <tr>
-                        <th>#</th>
-                        <th>Name</th>
-                        <th>Address</th>
-                        <th>Phone</th>
-                        <th>Website</th>
-                        <th>Email</th>
-                    </tr>
-                </thead>
-                <tbody>
+    // Virtualized table: only the rows in view are in the DOM
+    if (data.total > 0) {
+        tableDiv.innerHTML = `
+            <div class="table-viewport" id="tableViewport">
+                <table class="lead-table virtual">
+                    <thead>
+                        <tr>
+                            <th class="col-index">#</th>
+                            <th>Name</th>
+                            <th>Address</th>
+                            <th>Phone</th>
+                            <th>Website</th>
+                            <th>Email</th>
+                        </tr>
+                    </thead>
+                    <tbody id="leadRows"></tbody>
+                </table>
+            </div>
         `;
         
-        data.leads.forEach((lead, index) => {
-            tableHTML += `
+        const viewport = document.getElementById('tableViewport');
+        viewport.addEventListener('scroll', scheduleRender);
+        resultsDiv.style.display = 'block';
+        renderVisibleRows();
+    } else {
+        tableDiv.innerHTML = '<p>No leads found.</p>';
+        resultsDiv.style.display = 'block';
+    }
+}
+
+function scheduleRender() {
+    if (renderScheduled) {
+        return;
+    }
+    renderScheduled = true;
+    requestAnimationFrame(() => {
+        renderScheduled = false;
+        renderVisibleRows();
+    });
+}
+
+function renderVisibleRows() {
+    const viewport = document.getElementById('tableViewport');
+    const tbody = document.getElementById('leadRows');
+    if (!viewport || !tbody) {
+        return;
+    }
+    
+    const total = currentResult.total;
+    const first = Math.max(0, Math.floor(viewport.scrollTop / ROW_HEIGHT) - OVERSCAN_ROWS);
+    const last = Math.min(total, Math.ceil((viewport.scrollTop + viewport.clientHeight) / ROW_HEIGHT) + OVERSCAN_ROWS);
+    
+    let rowsHTML = `<tr class="spacer" style="height: ${first * ROW_HEIGHT}px"></tr>`;
+    for (let index = first; index < last; index++) {
+        const lead = currentLeads[index];
+        if (lead) {
+            rowsHTML += `
                 <tr>
-                    <td>${index + 1}</td>
+                    <td class="col-index">${index + 1}</td>
                     <td>${escapeHtml(lead.name)}</td>
                     <td>${escapeHtml(lead.address)}</td>
                     <td>${escapeHtml(lead.phone)}</td>
@@ -91,19 +143,55 @@ function displayResults(data) {
                     <td>${lead.email ? `<a href="mailto:${escapeHtml(lead.email)}">${escapeHtml(lead.email)}</a>` : '-'}</td>
                 </tr>
             `;
-        });
+        } else {
+            rowsHTML += `<tr class="loading-row"><td class="col-index">${index + 1}</td><td colspan="5">Loading...</td></tr>`;
+        }
+    }
+    rowsHTML += `<tr class="spacer" style="height: ${(total - last) * ROW_HEIGHT}px"></tr>`;
+    tbody.innerHTML = rowsHTML;
+    
+    // Fetch the next page once the view reaches rows we do not have yet
+    if (last > currentLeads.length && currentResult.nextCursor) {
+        loadNextPage().then(renderVisibleRows).catch(error => showError(error.message));
+    }
+}
+
+async function loadNextPage() {
+    if (currentResult.loading) {
+        return currentResult.loading;
+    }
+    if (!currentResult.nextCursor) {
+        return;
+    }
+    
+    const result = currentResult;
+    result.loading = (async () => {
+        const params = new URLSearchParams({ limit: PAGE_SIZE, cursor: result.nextCursor });
+        const response = await fetch(`/api/leads/${encodeURIComponent(result.resultId)}?${params}`);
+        const data = await response.json();
         
-        tableHTML += `
-                </tbody>
-            </table>
-        `;
+        if (!response.ok) {
+            throw new Error(data.error || 'Failed to fetch leads');
+        }
         
-        tableDiv.innerHTML = tableHTML;
-    } else {
-        tableDiv.innerHTML = '<p>No leads found.</p>';
-    }
+        // Ignore pages that arrive after a new search replaced the result
+        if (result === currentResult) {
+            currentLeads = currentLeads.concat(data.leads);
+            result.nextCursor = data.next_cursor;
+        }
+    })();
     
-    resultsDiv.style.display = 'block';
+    try {
+        await result.loading;
+    } finally {
+        result.loading = null;
+    }
+}
+
+async function loadAllLeads() {
+    while (currentResult.nextCursor) {
+        await loadNextPage();
+    }
 }
 
 function showError(message) {
@@ -120,10 +208,11 @@ function escapeHtml(text) {
         '"': '&quot;',
         "'": '&#039;'
     };
-    return text.replace(/[&<>"']/g, m => map[m]);
+    return String(text ?? '').replace(/[&<>"']/g, m => map[m]);
 }
 
-function exportToCSV() {
+async function exportToCSV() {
+    await loadAllLeads();
     if (currentLeads.length === 0) {
         alert('No leads to export');
         return;
@@ -138,7 +227,8 @@ function exportToCSV() {
     downloadFile(csv, 'leads.csv', 'text/csv');
 }
 
-function exportToJSON() {
+async function exportToJSON() {
+    await loadAllLeads();
     if (currentLeads.length === 0) {
         alert('No leads to export');
         return;
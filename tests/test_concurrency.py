@@ -0,0 +1,131 @@
+"""
+Tests for the adaptive Browser-Use task limiter
+"""
+import pytest
+
+from concurrency import AdaptiveLimiter, TaskFailed
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class Unavailable(Exception):
+    status_code = 503
+
+
+@pytest.fixture
+def make_limiter(monkeypatch):
+    def make(initial=2, minimum=1, maximum=10, cooldown=0, queue_wait_target=1):
+        monkeypatch.setenv('BU_CONCURRENCY_BACKOFF', '0.5')
+        monkeypatch.setenv('BU_CONCURRENCY_COOLDOWN', str(cooldown))
+        monkeypatch.setenv('BU_QUEUE_WAIT_TARGET', str(queue_wait_target))
+        monkeypatch.setenv('BU_QUEUE_TIMEOUT', '1')
+        return AdaptiveLimiter(initial_limit=initial, min_limit=minimum, max_limit=maximum)
+    return make
+
+
+def fill(limiter):
+    for _ in range(limiter.limit):
+        limiter.acquire()
+
+
+def test_no_increase_without_queueing(make_limiter):
+    limiter = make_limiter(initial=2)
+    for _ in range(20):
+        with limiter.slot():
+            pass
+    assert limiter.limit == 2
+
+
+def test_increase_while_callers_wait(make_limiter):
+    limiter = make_limiter(initial=2, maximum=4)
+    for _ in range(20):
+        fill(limiter)
+        limiter._waiting = 1
+        for _ in range(limiter.limit):
+            limiter.release(1.0)
+        limiter._waiting = 0
+    assert limiter.limit == 4
+
+
+def test_increase_on_queue_wait(make_limiter):
+    limiter = make_limiter(initial=2, queue_wait_target=1)
+    limiter._queue_wait_ewma = 2.0
+    fill(limiter)
+    limiter.release(1.0)
+    limiter.release(1.0)
+    assert limiter._limit == pytest.approx(2.5)
+
+
+def test_decrease_on_rate_limit(make_limiter):
+    limiter = make_limiter(initial=8)
+    limiter.acquire()
+    limiter.release(1.0, RateLimited('slow down'))
+    assert limiter.limit == 4
+    assert limiter.metrics()['rate_limited'] == 1
+
+
+def test_decrease_on_overload(make_limiter):
+    limiter = make_limiter(initial=8)
+    limiter.acquire()
+    limiter.release(1.0, Unavailable())
+    assert limiter.limit == 4
+
+
+def test_long_tasks_do_not_decrease(make_limiter):
+    limiter = make_limiter(initial=8)
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(3600.0)
+    assert limiter.limit == 8
+    assert limiter.metrics()['avg_latency_seconds'] == 3600.0
+
+
+def test_other_errors_do_not_decrease(make_limiter):
+    limiter = make_limiter(initial=8)
+    limiter.acquire()
+    limiter.release(1.0, KeyError('bug'))
+    assert limiter.limit == 8
+    assert limiter.metrics()['errors'] == 1
+
+
+def test_failed_task_through_slot(make_limiter):
+    limiter = make_limiter(initial=8)
+    with limiter.slot() as slot:
+        slot.fail(TaskFailed('status=stopped'))
+    assert limiter.limit == 4
+    assert limiter.metrics()['failed_tasks'] == 1
+    assert limiter.metrics()['in_flight'] == 0
+
+
+def test_cooldown_counts_a_burst_once(make_limiter):
+    limiter = make_limiter(initial=8, cooldown=60)
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(1.0, RateLimited())
+    assert limiter.limit == 4
+
+
+def test_limit_stays_within_bounds(make_limiter):
+    limiter = make_limiter(initial=4, minimum=2, maximum=5)
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(1.0, RateLimited())
+    assert limiter.limit == 2
+
+    for _ in range(50):
+        fill(limiter)
+        limiter._waiting = 1
+        for _ in range(limiter.limit):
+            limiter.release(1.0)
+        limiter._waiting = 0
+    assert limiter.limit == 5
+
+
+def test_acquire_times_out_when_full(make_limiter):
+    limiter = make_limiter(initial=1)
+    limiter.queue_timeout = 0.05
+    limiter.acquire()
+    with pytest.raises(TimeoutError):
+        limiter.acquire()
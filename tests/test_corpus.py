@@ -0,0 +1,40 @@
+"""
+Tests for capturing replay corpus samples
+"""
+import json
+
+from corpus import capture_sample, load_corpus
+from postprocess import clean_leads, parse_output
+from replay_corpus import check_sample
+
+
+OUTPUT = json.dumps({'leads': [
+    {'name': ' Cafe A ', 'address': '1 Main St', 'phone': '+91 98765 43210',
+     'website': 'cafea.in', 'email': 'Owner@CafeA.in'},
+    {'name': '', 'address': 'dropped', 'phone': '', 'website': '', 'email': 'gone@nowhere.in'},
+    {'name': 'Salon B', 'address': '2 Main St', 'phone': '', 'website': '', 'email': 'hi@salonb.in'},
+]})
+
+
+def test_captured_sample_records_scrubbed_expected_leads(tmp_path):
+    cleaned = clean_leads(parse_output(OUTPUT))
+    capture_sample(OUTPUT, cleaned, 'Cafes in Pune', str(tmp_path))
+
+    sample, = load_corpus(str(tmp_path))
+    assert sample['expected_count'] == 2
+    assert 'Owner@CafeA.in' not in json.dumps(sample)
+    assert '98765' not in json.dumps(sample)
+    assert [lead['name'] for lead in sample['expected']] == ['Cafe A', 'Salon B']
+    assert sample['expected'] == clean_leads(parse_output(sample['output']))
+
+
+def test_replay_flags_a_changed_field():
+    sample = load_corpus()[0]
+    leads = [dict(lead) for lead in sample['expected']]
+    result = {'leads': leads, 'count': len(leads)}
+    assert check_sample(sample, result, None, 0.3) == ([], [])
+
+    leads[0]['website'] = 'http://changed.example.com'
+    failures, _ = check_sample(sample, result, None, 0.3)
+    assert failures == [f"lead 0 website: got 'http://changed.example.com', "
+                        f"expected {sample['expected'][0]['website']!r}"]
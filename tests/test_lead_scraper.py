@@ -0,0 +1,146 @@
+"""
+Tests for progressive scraping with a fake Browser-Use client
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from lead_scraper import LeadScraper
+
+
+def lead(name, address='1 Main St', phone='', website='', email=''):
+    return {'name': name, 'address': address, 'phone': phone, 'website': website, 'email': email}
+
+
+class FakeTask:
+    """Replays agent step memories, then finishes with the given output"""
+
+    id = 'task-1'
+
+    def __init__(self, memories, final_leads, status='finished'):
+        self.memories = memories
+        self.final_leads = final_leads
+        self.status = status
+
+    def watch(self):
+        steps = []
+        for number, memory in enumerate(self.memories, 1):
+            steps.append(SimpleNamespace(number=number, memory=memory))
+            yield SimpleNamespace(status='started', is_success=None, steps=list(steps), output=None)
+        yield SimpleNamespace(status=self.status, is_success=self.status == 'finished', steps=list(steps),
+                              output=json.dumps({'leads': self.final_leads}))
+
+    def complete(self):
+        return list(self.watch())[-1]
+
+
+@pytest.fixture
+def scraper(monkeypatch):
+    monkeypatch.delenv('BROWSER_USE_API_KEY', raising=False)
+    monkeypatch.delenv('LEAD_SHARD_SIZE', raising=False)
+    monkeypatch.delenv('LEAD_CORPUS_CAPTURE_DIR', raising=False)
+    scraper = LeadScraper()
+    scraper.tasks = []
+    scraper.prompts = []
+
+    def create_task(task):
+        scraper.prompts.append(task)
+        return scraper.tasks.pop(0)
+
+    scraper.client = SimpleNamespace(tasks=SimpleNamespace(create_task=create_task))
+    return scraper
+
+
+def run(scraper, num_leads=5, require_email=True):
+    """Run a progressive scrape into a list the way the result store is filled"""
+    stored = []
+    batches = []
+
+    def on_leads(leads):
+        batches.append([item['name'] for item in leads])
+        stored.extend(leads)
+
+    def on_update(index, updated):
+        stored[index] = updated
+
+    count = scraper.scrape_google_maps_progressive('Cafes in Pune', num_leads, require_email, on_leads, on_update)
+    assert count == len(stored)
+    return stored, batches
+
+
+def test_streamed_leads_are_reported_step_by_step(scraper):
+    scraper.tasks.append(FakeTask(
+        ['Searching', 'Noted ' + json.dumps(lead('Cafe A')),
+         'Noted ' + json.dumps(lead('Cafe A')) + '\n' + json.dumps(lead('Cafe B'))],
+        [lead('Cafe A'), lead('Cafe B'), lead('Cafe C')]
+    ))
+    stored, batches = run(scraper)
+    assert batches == [['Cafe A'], ['Cafe B'], ['Cafe C']]
+    assert [item['name'] for item in stored] == ['Cafe A', 'Cafe B', 'Cafe C']
+    assert 'add it to your memory' in scraper.prompts[0]
+
+
+def test_final_output_fills_in_streamed_leads(scraper):
+    scraper.tasks.append(FakeTask(
+        ['Noted ' + json.dumps(lead('Cafe A', website='cafea.in'))],
+        [lead('Cafe A', phone='+91 98765 43210', website='https://cafea.in', email='hi@cafea.com')]
+    ))
+    stored, _ = run(scraper)
+    assert stored == [lead('Cafe A', phone='+91 98765 43210', website='https://cafea.in', email='hi@cafea.com')]
+
+
+def test_reworded_address_is_merged_not_duplicated(scraper):
+    scraper.tasks.append(FakeTask(
+        ['Noted ' + json.dumps(lead('Cafe A', address='12 MG Rd')) + ' ' + json.dumps(lead('Cafe B'))],
+        [lead('Cafe A', address='12, M.G. Road', email='hi@cafea.com'), lead('Cafe B'), lead('Cafe C')]
+    ))
+    stored, _ = run(scraper, num_leads=3)
+    assert [item['name'] for item in stored] == ['Cafe A', 'Cafe B', 'Cafe C']
+    assert stored[0]['email'] == 'hi@cafea.com'
+    assert stored[0]['address'] == '12 MG Rd'
+
+
+def test_only_final_output_counts_towards_num_leads(scraper):
+    scraper.tasks.append(FakeTask(
+        ['Noted ' + json.dumps(lead('Cafe X')) + ' ' + json.dumps(lead('Cafe A'))],
+        [lead('Cafe A'), lead('Cafe B'), lead('Cafe C')]
+    ))
+    stored, _ = run(scraper, num_leads=2)
+    # Cafe X was already shown to readers; the two final leads still both make it in
+    assert [item['name'] for item in stored] == ['Cafe X', 'Cafe A', 'Cafe B']
+
+
+def test_branches_with_the_same_name_stay_separate(scraper):
+    scraper.tasks.append(FakeTask(
+        ['Noted ' + json.dumps(lead('Chain Cafe', address='1 North St')) + ' '
+         + json.dumps(lead('Chain Cafe', address='9 South St'))],
+        [lead('Chain Cafe', address='1 North St'), lead('Chain Cafe', address='9 South St')]
+    ))
+    stored, _ = run(scraper)
+    assert [item['address'] for item in stored] == ['1 North St', '9 South St']
+
+
+def test_streamed_leads_survive_a_failed_task(scraper):
+    scraper.tasks.append(FakeTask(['Noted ' + json.dumps(lead('Cafe A'))], [], status='stopped'))
+    stored, _ = run(scraper)
+    assert [item['name'] for item in stored] == ['Cafe A']
+    assert scraper.task_limiter.metrics()['failed_tasks'] == 1
+
+
+def test_failed_task_without_leads_raises(scraper):
+    scraper.tasks.append(FakeTask(['Searching'], []))
+    with pytest.raises(ValueError):
+        run(scraper)
+
+
+def test_shards_merge_overlapping_results(scraper, monkeypatch):
+    monkeypatch.setenv('LEAD_SHARD_SIZE', '2')
+    scraper.tasks.extend([
+        FakeTask([], [lead('Cafe A'), lead('Cafe B')]),
+        FakeTask([], [lead('Cafe B', email='b@cafeb.in'), lead('Cafe C')]),
+    ])
+    stored, _ = run(scraper, num_leads=4)
+    assert sorted(item['name'] for item in stored) == ['Cafe A', 'Cafe B', 'Cafe C']
+    assert next(item for item in stored if item['name'] == 'Cafe B')['email'] == 'b@cafeb.in'
+    assert not any('add it to your memory' in prompt for prompt in scraper.prompts)
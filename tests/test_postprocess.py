@@ -0,0 +1,97 @@
+"""
+Tests for the post-processing pool and its inline fallback
+"""
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from corpus import load_corpus
+from postprocess import PostProcessor, clean_leads, parse_output, parse_step_leads
+
+SAMPLES = load_corpus()
+
+
+def inline(output):
+    return clean_leads(parse_output(output))
+
+
+@pytest.fixture(scope='module')
+def pooled():
+    """A one-worker pool that takes every input, however small"""
+    processor = PostProcessor(workers=1)
+    processor.min_output_chars = 0
+    processor.min_batch = 0
+    processor.chunk_size = 7
+    yield processor
+    processor.shutdown()
+
+
+def test_pool_is_off_by_default(monkeypatch):
+    monkeypatch.delenv('LEAD_POSTPROCESS_WORKERS', raising=False)
+    processor = PostProcessor()
+    assert processor.workers == 0
+    assert processor._get_pool() is None
+
+
+@pytest.mark.parametrize('sample', SAMPLES, ids=[sample['name'] for sample in SAMPLES])
+def test_pool_matches_inline(pooled, sample):
+    output = sample['output']
+    expected = inline(output)
+    assert pooled.parse_and_clean(output) == expected
+    assert pooled.clean(parse_output(output)) == expected
+
+
+class StalledPool:
+    """Stands in for a pool whose workers hang or have died"""
+
+    def __init__(self, error):
+        self.error = error
+        self.shut_down = False
+
+    def submit(self, *args):
+        error = self.error
+
+        class Future:
+            def result(self, timeout=None):
+                raise error
+        return Future()
+
+    def map(self, *args, timeout=None):
+        raise self.error
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.mark.parametrize('error', [FutureTimeoutError(), BrokenProcessPool('worker died')])
+def test_stalled_pool_falls_back_inline(error):
+    processor = PostProcessor(workers=1)
+    processor.min_output_chars = 0
+    processor.min_batch = 0
+    pool = StalledPool(error)
+    processor._pool = pool
+
+    large = max(SAMPLES, key=lambda sample: len(str(sample['output'])))['output']
+    assert processor.parse_and_clean(large) == inline(large)
+    assert pool.shut_down
+    assert processor._pool is None
+
+    pool = StalledPool(error)
+    processor._pool = pool
+    leads = parse_output(large)
+    assert processor.clean(leads) == clean_leads(leads)
+    assert pool.shut_down
+    assert processor._pool is None
+
+
+def test_parse_step_leads():
+    memory = ('Visited 2 listings. {"name": "Cafe A", "address": "1 St", "phone": null} '
+              'then {"name": broken} and {"rating": 4.5} '
+              '{"name": "Cafe B", "website": "cafeb.in", "extra": "ignored"}')
+    assert parse_step_leads(memory) == [
+        {'name': 'Cafe A', 'address': '1 St', 'phone': '', 'website': '', 'email': ''},
+        {'name': 'Cafe B', 'address': '', 'phone': '', 'website': 'cafeb.in', 'email': ''},
+    ]
+    assert parse_step_leads('') == []
+    assert parse_step_leads(None) == []
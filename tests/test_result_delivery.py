@@ -0,0 +1,145 @@
+"""
+Tests for callback URL checks and the result outbox
+"""
+import socket
+import time
+
+import pytest
+
+import result_delivery
+from result_delivery import ResultDispatcher, check_callback_url
+
+
+@pytest.fixture
+def dispatcher(tmp_path, monkeypatch):
+    monkeypatch.setenv('DELIVERY_BATCH_WINDOW', '0')
+    monkeypatch.setenv('DELIVERY_MAX_BATCH_SIZE', '2')
+    monkeypatch.setenv('DELIVERY_MAX_ATTEMPTS', '2')
+    monkeypatch.setenv('DELIVERY_BASE_BACKOFF', '0')
+    monkeypatch.delenv('SMTP_HOST', raising=False)
+    d = ResultDispatcher(str(tmp_path / 'outbox.db'))
+    d.sent = []
+    d.failures = 0
+
+    def send_callback(url, results):
+        if d.failures:
+            d.failures -= 1
+            raise RuntimeError('HTTP 500')
+        d.sent.append((url, [result['query'] for result in results]))
+
+    monkeypatch.setattr(d, '_send_callback', send_callback)
+    return d
+
+
+def result(query):
+    return {'query': query, 'success': True, 'leads': [], 'count': 0}
+
+
+def test_results_are_batched_per_destination(dispatcher):
+    for query in ('a', 'b', 'c'):
+        dispatcher.enqueue(result(query), callback_url='https://hooks.test/one')
+    dispatcher.enqueue(result('d'), callback_url='https://hooks.test/two')
+
+    dispatcher.dispatch_due()
+    assert sorted(dispatcher.sent) == [
+        ('https://hooks.test/one', ['a', 'b']),
+        ('https://hooks.test/one', ['c']),
+        ('https://hooks.test/two', ['d']),
+    ]
+    assert dispatcher.stats() == {'pending': 0, 'dead': 0}
+
+
+def test_batch_waits_for_the_window(dispatcher):
+    dispatcher.batch_window = 60
+    dispatcher.enqueue(result('a'), callback_url='https://hooks.test/one')
+    next_wake = dispatcher.dispatch_due()
+    assert dispatcher.sent == []
+    assert 0 < next_wake <= 60
+
+
+def test_failed_batch_is_retried(dispatcher):
+    dispatcher.failures = 1
+    dispatcher.enqueue(result('a'), callback_url='https://hooks.test/one')
+
+    dispatcher.dispatch_due()
+    assert dispatcher.sent == []
+    assert dispatcher.stats() == {'pending': 1, 'dead': 0}
+
+    dispatcher.dispatch_due()
+    assert dispatcher.sent == [('https://hooks.test/one', ['a'])]
+    assert dispatcher.stats() == {'pending': 0, 'dead': 0}
+
+
+def test_result_goes_dead_after_max_attempts(dispatcher):
+    dispatcher.failures = 5
+    dispatcher.enqueue(result('a'), callback_url='https://hooks.test/one')
+    dispatcher.dispatch_due()
+    dispatcher.dispatch_due()
+    dispatcher.dispatch_due()
+    assert dispatcher.sent == []
+    assert dispatcher.stats() == {'pending': 0, 'dead': 1}
+
+
+def test_dead_results_are_purged_after_retention(dispatcher):
+    dispatcher.failures = 5
+    dispatcher.enqueue(result('a'), callback_url='https://hooks.test/one')
+    dispatcher.dispatch_due()
+    dispatcher.dispatch_due()
+
+    assert dispatcher.purge_dead() == 0
+    dispatcher.dead_retention = 0
+    time.sleep(0.01)
+    assert dispatcher.purge_dead() == 1
+    assert dispatcher.stats() == {'pending': 0, 'dead': 0}
+
+
+def test_email_is_skipped_without_smtp(dispatcher):
+    dispatcher.enqueue(result('a'), email='someone@example.com')
+    assert dispatcher.stats() == {'pending': 0, 'dead': 0}
+
+
+@pytest.fixture
+def resolve(monkeypatch):
+    """Make check_callback_url resolve every host to the given address"""
+    def set_address(address):
+        family = socket.AF_INET6 if ':' in address else socket.AF_INET
+        monkeypatch.setattr(result_delivery.socket, 'getaddrinfo',
+                            lambda host, port: [(family, socket.SOCK_STREAM, 6, '', (address, 443))])
+    monkeypatch.delenv('CALLBACK_ALLOWED_HOSTS', raising=False)
+    return set_address
+
+
+def test_public_callback_is_accepted(resolve):
+    resolve('93.184.216.34')
+    check_callback_url('https://hooks.test/webhook')
+
+
+@pytest.mark.parametrize('address', ['127.0.0.1', '10.0.0.5', '192.168.1.10', '169.254.169.254',
+                                     '::1', 'fe80::1', '224.0.0.1'])
+def test_non_public_callback_is_rejected(resolve, address):
+    resolve(address)
+    with pytest.raises(ValueError):
+        check_callback_url('https://hooks.test/webhook')
+
+
+@pytest.mark.parametrize('url', ['ftp://hooks.test/webhook', 'hooks.test/webhook', 'https://'])
+def test_malformed_callback_is_rejected(resolve, url):
+    resolve('93.184.216.34')
+    with pytest.raises(ValueError):
+        check_callback_url(url)
+
+
+def test_unresolvable_callback_is_rejected(monkeypatch):
+    def fail(host, port):
+        raise socket.gaierror('no such host')
+    monkeypatch.setattr(result_delivery.socket, 'getaddrinfo', fail)
+    with pytest.raises(ValueError):
+        check_callback_url('https://missing.test/webhook')
+
+
+def test_allowed_private_host(resolve, monkeypatch):
+    resolve('10.0.0.5')
+    monkeypatch.setenv('CALLBACK_ALLOWED_HOSTS', 'n8n.internal, other.internal')
+    check_callback_url('http://N8N.internal:5678/webhook')
+    with pytest.raises(ValueError):
+        check_callback_url('http://elsewhere.internal/webhook')
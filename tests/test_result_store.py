@@ -0,0 +1,121 @@
+"""
+Tests for the in-memory result store and its cursors
+"""
+import threading
+
+import pytest
+
+from result_store import ResultStore, encode_cursor, decode_cursor
+
+
+def make_leads(count):
+    return [{'name': f'Business {i}', 'address': '', 'phone': '', 'website': '', 'email': ''}
+            for i in range(count)]
+
+
+def test_page_walks_a_finished_result():
+    store = ResultStore(ttl=60, max_results=10)
+    result_id = store.save(make_leads(5))
+
+    page, total, cursor = store.page(result_id, 2)
+    assert [lead['name'] for lead in page] == ['Business 0', 'Business 1']
+    assert total == 5
+
+    page, _, cursor = store.page(result_id, 2, cursor)
+    assert [lead['name'] for lead in page] == ['Business 2', 'Business 3']
+
+    page, _, cursor = store.page(result_id, 2, cursor)
+    assert [lead['name'] for lead in page] == ['Business 4']
+    assert cursor == ''
+
+
+def test_page_keeps_a_cursor_while_running():
+    store = ResultStore(ttl=60, max_results=10)
+    result_id = store.create()
+    store.append(result_id, make_leads(2))
+
+    page, total, cursor = store.page(result_id, 10)
+    assert len(page) == total == 2
+    assert decode_cursor(cursor) == 2
+
+    store.append(result_id, make_leads(1))
+    store.finish(result_id)
+    page, total, cursor = store.page(result_id, 10, cursor)
+    assert len(page) == 1
+    assert total == 3
+    assert cursor == ''
+
+
+def test_page_of_unknown_result():
+    assert ResultStore(ttl=60).page('missing', 10) is None
+
+
+def test_oldest_results_are_evicted():
+    store = ResultStore(ttl=60, max_results=2)
+    first = store.save(make_leads(1))
+    store.save(make_leads(1))
+    store.save(make_leads(1))
+    assert store.get(first) is None
+
+
+def test_wait_returns_once_min_leads_arrive():
+    store = ResultStore(ttl=60)
+    result_id = store.create()
+    timer = threading.Timer(0.05, store.append, (result_id, make_leads(3)))
+    timer.start()
+
+    result = store.wait(result_id, 3, timeout=5)
+    timer.join()
+    assert result['status'] == 'running'
+    assert len(result['leads']) == 3
+
+
+def test_wait_returns_when_finished_short():
+    store = ResultStore(ttl=60)
+    result_id = store.create()
+    store.append(result_id, make_leads(1))
+    store.finish(result_id, 'boom')
+
+    result = store.wait(result_id, 10, timeout=5)
+    assert result['status'] == 'failed'
+    assert result['error'] == 'boom'
+    assert len(result['leads']) == 1
+
+
+def test_wait_times_out_with_partial_result():
+    store = ResultStore(ttl=60)
+    result_id = store.create()
+    store.append(result_id, make_leads(1))
+
+    result = store.wait(result_id, 10, timeout=0.05)
+    assert result['status'] == 'running'
+    assert len(result['leads']) == 1
+
+
+def test_wait_for_unknown_result():
+    assert ResultStore(ttl=60).wait('missing', 1, timeout=0.01) is None
+
+
+def test_update_replaces_one_lead():
+    store = ResultStore(ttl=60)
+    result_id = store.create()
+    store.append(result_id, make_leads(2))
+    before = store.get(result_id)
+
+    store.update(result_id, 1, dict(before['leads'][1], email='hi@business1.in'))
+    store.update(result_id, 5, {'name': 'out of range'})
+    leads = store.get(result_id)['leads']
+    assert [lead['email'] for lead in leads] == ['', 'hi@business1.in']
+    assert before['leads'][1]['email'] == ''
+
+
+def test_cursor_round_trip():
+    assert decode_cursor('') == 0
+    assert decode_cursor(encode_cursor(0)) == 0
+    assert decode_cursor(encode_cursor(1234)) == 1234
+
+
+@pytest.mark.parametrize('cursor', ['not a cursor!', encode_cursor(-1), 'YWJj'])
+def test_decode_cursor_rejects_malformed(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
@@ -0,0 +1,88 @@
+"""
+Tests for response format and content encoding negotiation
+"""
+import pytest
+
+import serialization
+from serialization import negotiate_encoding, negotiate_format
+
+
+@pytest.fixture
+def gzip_only(monkeypatch):
+    monkeypatch.setattr(serialization, 'ZSTD_AVAILABLE', False)
+    monkeypatch.setattr(serialization, 'BROTLI_AVAILABLE', False)
+
+
+@pytest.fixture
+def all_encodings(monkeypatch):
+    monkeypatch.setattr(serialization, 'ZSTD_AVAILABLE', True)
+    monkeypatch.setattr(serialization, 'BROTLI_AVAILABLE', True)
+
+
+def test_no_header_means_identity(gzip_only):
+    assert negotiate_encoding('') == 'identity'
+    assert negotiate_encoding(None) == 'identity'
+
+
+def test_gzip_accepted(gzip_only):
+    assert negotiate_encoding('gzip, deflate') == 'gzip'
+
+
+@pytest.mark.parametrize('header', ['gzip;q=0', 'gzip;Q=0', 'gzip; q = 0', 'gzip;q=oops'])
+def test_zero_quality_refuses_encoding(gzip_only, header):
+    assert negotiate_encoding(header) == 'identity'
+
+
+def test_wildcard(gzip_only):
+    assert negotiate_encoding('*') == 'gzip'
+    assert negotiate_encoding('*, gzip;q=0') == 'identity'
+
+
+def test_unsupported_encodings_only(gzip_only):
+    assert negotiate_encoding('deflate, identity') == 'identity'
+
+
+def test_preference_order_and_quality(all_encodings):
+    assert negotiate_encoding('gzip, br, zstd') == 'zstd'
+    assert negotiate_encoding('gzip;q=1.0, br;q=0.5, zstd;q=0.1') == 'gzip'
+    assert negotiate_encoding('GZIP;q=0.2, BR;Q=0.8') == 'br'
+
+
+def test_format_defaults_to_json():
+    assert negotiate_format() == 'json'
+    assert negotiate_format('', 'application/json') == 'json'
+
+
+def test_explicit_format_is_case_insensitive():
+    assert negotiate_format(' Compact ') == 'compact'
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        negotiate_format('xml')
+
+
+def test_msgpack_from_accept(monkeypatch):
+    monkeypatch.setattr(serialization, 'MSGPACK_AVAILABLE', True)
+    assert negotiate_format('', 'application/x-msgpack, */*') == 'msgpack'
+
+
+def test_msgpack_not_installed(monkeypatch):
+    monkeypatch.setattr(serialization, 'MSGPACK_AVAILABLE', False)
+    with pytest.raises(ValueError):
+        negotiate_format('msgpack')
+    with pytest.raises(ValueError):
+        negotiate_format('', 'application/msgpack')
+
+
+@pytest.mark.parametrize('accept, expected', [
+    ('application/json, application/msgpack;q=0', 'json'),
+    ('application/json, application/msgpack;Q=0.5', 'json'),
+    ('application/json;q=0.5, application/msgpack', 'msgpack'),
+    ('application/msgpack, application/json', 'msgpack'),
+    ('*/*', 'json'),
+    ('text/html, application/msgpack-extra', 'json'),
+])
+def test_msgpack_respects_quality(monkeypatch, accept, expected):
+    monkeypatch.setattr(serialization, 'MSGPACK_AVAILABLE', True)
+    assert negotiate_format('', accept) == expected